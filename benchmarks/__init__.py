@@ -0,0 +1,10 @@
+import os
+
+# guara.settings requires these at import; benchmarks bring their own DB.
+os.environ.setdefault('DATABASE_URL', 'sqlite+aiosqlite:///:memory:')
+os.environ.setdefault('SECRET_KEY', 'benchmark-secret-key-not-for-production')
+os.environ.setdefault('ALGORITHM', 'HS256')
+os.environ.setdefault('ACCESS_TOKEN_EXPIRE_MINUTES', '30')
+# Every simulated client shares one address, and the login workloads are
+# there to measure hashing, so admission control stays out of the way.
+os.environ.setdefault('LOGIN_LIMITER_BACKEND', 'none')
@@ -0,0 +1,220 @@
+"""Shared plumbing for the benchmarks: seeding, app boot and reporting."""
+
+import asyncio
+import os
+import random
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from contextlib import asynccontextmanager
+from dataclasses import dataclass, field
+
+from httpx import ASGITransport, AsyncClient, TransportError
+from sqlalchemy import insert, select
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+
+from guara.app import app
+from guara.database import get_session
+from guara.models import Todo, TodoState, User, table_registry
+from guara.ratelimit import login_limiter
+from guara.security import get_password_hash
+
+PASSWORD = 'benchmark'
+WORDS = (
+    'buy milk call mom review pull request deploy release write report '
+    'book flights fix bug plan sprint pay invoice renew passport clean '
+    'garage update docs prepare slides water plants backup laptop'
+).split()
+
+
+@dataclass
+class Seed:
+    users: list[tuple[int, str]]
+    todo_ids: dict[int, list[int]] = field(default_factory=dict)
+
+
+def sample_todo(rng: random.Random, user_id: int | None = None) -> dict:
+    todo = {
+        'title': ' '.join(rng.choices(WORDS, k=rng.randint(2, 5))),
+        'description': ' '.join(rng.choices(WORDS, k=rng.randint(5, 20))),
+        'state': rng.choice(list(TodoState)),
+    }
+    if user_id is not None:
+        todo['user_id'] = user_id
+    return todo
+
+
+async def seed(engine, users: int, todos_per_user: int, rng) -> Seed:
+    async with engine.begin() as conn:
+        await conn.run_sync(table_registry.metadata.drop_all)
+        await conn.run_sync(table_registry.metadata.create_all)
+
+    # every account shares one hash so seeding doesn't pay Argon2 per user
+    hashed = get_password_hash(PASSWORD)
+    async with AsyncSession(engine, expire_on_commit=False) as session:
+        rows = await session.execute(
+            insert(User).returning(User.id, User.email),
+            [
+                {
+                    'username': f'bench{n}',
+                    'email': f'bench{n}@bench.com',
+                    'password': hashed,
+                }
+                for n in range(users)
+            ],
+        )
+        result = Seed(users=[tuple(row) for row in rows])
+
+        for user_id, _ in result.users:
+            await session.execute(
+                insert(Todo),
+                [sample_todo(rng, user_id) for _ in range(todos_per_user)],
+            )
+        await session.commit()
+
+        rows = await session.execute(select(Todo.user_id, Todo.id))
+        for user_id, todo_id in rows:
+            result.todo_ids.setdefault(user_id, []).append(todo_id)
+
+    return result
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+@asynccontextmanager
+async def in_process_client(engine):
+    async def get_session_override():
+        async with AsyncSession(engine, expire_on_commit=False) as session:
+            yield session
+
+    app.dependency_overrides[get_session] = get_session_override
+    # guara may have been imported before LOGIN_LIMITER_BACKEND was set
+    buckets, login_limiter.buckets = login_limiter.buckets, None
+    try:
+        async with AsyncClient(
+            transport=ASGITransport(app=app), base_url='http://bench'
+        ) as client:
+            yield client
+    finally:
+        app.dependency_overrides.clear()
+        login_limiter.buckets = buckets
+
+
+@asynccontextmanager
+async def uvicorn_client(database_url: str, workers: int):
+    port = _free_port()
+    server = subprocess.Popen(
+        [
+            sys.executable,
+            '-m',
+            'uvicorn',
+            'guara.app:app',
+            '--port',
+            str(port),
+            '--workers',
+            str(workers),
+            '--log-level',
+            'warning',
+        ],
+        env=os.environ | {'DATABASE_URL': database_url},
+    )
+    try:
+        async with AsyncClient(base_url=f'http://127.0.0.1:{port}') as client:
+            for _ in range(100):
+                try:
+                    await client.get('/')
+                    break
+                except TransportError:
+                    await asyncio.sleep(0.1)
+            else:
+                raise RuntimeError('uvicorn did not start')
+            yield client
+    finally:
+        server.terminate()
+        server.wait()
+
+
+@asynccontextmanager
+async def open_app(
+    database_url: str | None, server: str = 'inprocess', workers: int = 1
+):
+    """Yield ``(engine, client)`` for a fresh database behind the app."""
+    with tempfile.TemporaryDirectory() as tmp:
+        url = database_url or f'sqlite+aiosqlite:///{tmp}/bench.db'
+        engine = create_async_engine(url)
+        try:
+            if server == 'uvicorn':
+                client = uvicorn_client(url, workers)
+            else:
+                client = in_process_client(engine)
+            async with client as http:
+                yield engine, http
+        finally:
+            await engine.dispose()
+
+
+async def login(client: AsyncClient, email: str) -> dict:
+    response = await client.post(
+        '/auth/token', data={'username': email, 'password': PASSWORD}
+    )
+    return {'Authorization': f'Bearer {response.json()["access_token"]}'}
+
+
+def percentile(samples: list[float], pct: int) -> float:
+    if len(samples) == 1:
+        return samples[0]
+    return statistics.quantiles(samples, n=100, method='inclusive')[pct - 1]
+
+
+def summarize(samples: list[float], errors: int, elapsed: float) -> dict:
+    return {
+        'count': len(samples),
+        'errors': errors,
+        'rps': round(len(samples) / elapsed, 2),
+        'p50_ms': round(percentile(samples, 50) * 1000, 2),
+        'p95_ms': round(percentile(samples, 95) * 1000, 2),
+        'p99_ms': round(percentile(samples, 99) * 1000, 2),
+    }
+
+
+class Recorder:
+    def __init__(self):
+        self.samples: dict[str, list[float]] = {}
+        self.errors: dict[str, int] = {}
+        self.started = time.perf_counter()
+
+    @asynccontextmanager
+    async def measure(self, endpoint: str):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.samples.setdefault(endpoint, []).append(
+                time.perf_counter() - start
+            )
+
+    def fail(self, endpoint: str):
+        self.errors[endpoint] = self.errors.get(endpoint, 0) + 1
+
+    def report(self) -> dict:
+        elapsed = time.perf_counter() - self.started
+        total = sum(len(samples) for samples in self.samples.values())
+        return {
+            'elapsed_s': round(elapsed, 3),
+            'requests': total,
+            'rps': round(total / elapsed, 2),
+            'errors': sum(self.errors.values()),
+            'endpoints': {
+                endpoint: summarize(
+                    samples, self.errors.get(endpoint, 0), elapsed
+                )
+                for endpoint, samples in sorted(self.samples.items())
+            },
+        }
@@ -0,0 +1,90 @@
+"""Latency of ``GET /todos/`` while logins are in flight.
+
+Boots ``guara.app:app`` in-process against a throwaway SQLite database,
+keeps ``--logins`` concurrent login loops hammering ``/auth/token`` and
+measures ``GET /todos/`` latency from a single reader. Run it twice to
+compare hashing on the executor against hashing on the event loop::
+
+    python -m benchmarks.login_contention
+    python -m benchmarks.login_contention --inline
+"""
+
+import argparse
+import asyncio
+import json
+import random
+import time
+
+from benchmarks.harness import PASSWORD, login, open_app, percentile, seed
+from guara import security
+
+
+class InlineHasher:
+    """Stand-in for ``PasswordHasher`` that hashes on the event loop."""
+
+    @staticmethod
+    async def run(func, *args):
+        return func(*args)
+
+
+async def run(logins: int, requests: int, todos: int) -> dict:
+    async with open_app(None) as (engine, client):
+        seeded = await seed(engine, 1, todos, random.Random(0))
+        _, email = seeded.users[0]
+        headers = await login(client, email)
+        credentials = {'username': email, 'password': PASSWORD}
+
+        done = asyncio.Event()
+        completed_logins = 0
+
+        async def login_loop():
+            nonlocal completed_logins
+            while not done.is_set():
+                await client.post('/auth/token', data=credentials)
+                completed_logins += 1
+
+        storm = [asyncio.create_task(login_loop()) for _ in range(logins)]
+        await asyncio.sleep(0.1)
+
+        latencies = []
+        for _ in range(requests):
+            start = time.perf_counter()
+            await client.get('/todos/', headers=headers)
+            latencies.append((time.perf_counter() - start) * 1000)
+
+        done.set()
+        await asyncio.gather(*storm)
+
+    return {
+        'logins_in_flight': logins,
+        'logins_completed': completed_logins,
+        'requests': requests,
+        'p50_ms': round(percentile(latencies, 50), 2),
+        'p99_ms': round(percentile(latencies, 99), 2),
+        'max_ms': round(max(latencies), 2),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--logins', type=int, default=8)
+    parser.add_argument('--requests', type=int, default=200)
+    parser.add_argument('--todos', type=int, default=100)
+    parser.add_argument(
+        '--inline',
+        action='store_true',
+        help='hash on the event loop instead of the executor',
+    )
+    args = parser.parse_args()
+
+    if args.inline:
+        security.password_hasher = InlineHasher()
+
+    result = asyncio.run(run(args.logins, args.requests, args.todos))
+    result['hasher'] = 'inline' if args.inline else 'executor'
+    result['hash_workers'] = security.settings.PASSWORD_HASH_WORKERS
+    print(json.dumps(result, indent=2))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,94 @@
+"""Serialization cost of the ``GET /todos/`` and ``GET /users/`` bodies.
+
+Seeds a throwaway SQLite database, loads a page of rows both ways and
+times only the step from fetched rows to response bytes, reported per 1k
+rows:
+
+- ``response_model``: ORM objects validated into ``TodoList`` and dumped
+  to JSON-compatible Python, then encoded with ``json.dumps``, which is
+  what FastAPI does for a plain ``return`` from the endpoint;
+- ``fast_path``: the column rows the endpoints now select, encoded by
+  their precompiled ``guara.serializers.ListSerializer``.
+
+::
+
+    python -m benchmarks.serialization --rows 5000
+"""
+
+import argparse
+import asyncio
+import json
+import random
+import time
+
+from pydantic import TypeAdapter
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from benchmarks.harness import open_app, seed
+from guara.models import Todo, User
+from guara.routers.todos import TODOS
+from guara.routers.users import USERS
+from guara.schemas import TodoList, UserList
+
+
+def time_per_1k(func, rows: int, rounds: int) -> float:
+    best = float('inf')
+    for _ in range(rounds):
+        start = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - start)
+    return round(best * 1000 * 1000 / rows, 3)
+
+
+def compare(serializer, schema, objects, rows, rounds: int) -> dict:
+    adapter = TypeAdapter(schema)
+
+    def response_model():
+        content = adapter.validate_python(
+            {serializer.key: objects}, from_attributes=True
+        )
+        return json.dumps(adapter.dump_python(content, mode='json')).encode()
+
+    def fast_path():
+        return serializer.dump_json(rows)
+
+    assert json.loads(response_model()) == json.loads(fast_path())
+
+    before = time_per_1k(response_model, len(rows), rounds)
+    after = time_per_1k(fast_path, len(rows), rounds)
+    return {
+        'rows': len(rows),
+        'response_model_ms_per_1k': before,
+        'fast_path_ms_per_1k': after,
+        'speedup': round(before / after, 2),
+    }
+
+
+async def run(rows: int, rounds: int) -> dict:
+    async with open_app(None) as (engine, _):
+        # one todo per account gives ``rows`` of each kind in a single seed
+        await seed(engine, rows, 1, random.Random(0))
+        async with AsyncSession(engine) as session:
+            users = (await session.scalars(select(User))).all()
+            user_rows = (await session.execute(select(*USERS.columns))).all()
+            todos = (await session.scalars(select(Todo))).all()
+            todo_rows = (await session.execute(select(*TODOS.columns))).all()
+
+    return {
+        'todos': compare(TODOS, TodoList, todos, todo_rows, rounds),
+        'users': compare(USERS, UserList, users, user_rows, rounds),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--rows', type=int, default=1000)
+    parser.add_argument('--rounds', type=int, default=20)
+    args = parser.parse_args()
+
+    print(json.dumps(asyncio.run(run(args.rows, args.rounds)), indent=2))
+
+
+if __name__ == '__main__':
+    main()
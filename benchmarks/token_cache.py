@@ -0,0 +1,75 @@
+"""Per-request cost of authenticating a bearer token.
+
+Times ``guara.security.get_current_identity`` in stateless mode, which
+is the whole of what an authenticated todo request spends on auth when
+no user row is needed, reported in microseconds per request:
+
+- ``uncached``: every call verifies the signature and parses the claims,
+  as a client sending a fresh token each time would cost;
+- ``cached``: the same token again, answered from the decoded-token cache
+  as it is for a client making many calls with one token.
+
+::
+
+    python -m benchmarks.token_cache --requests 20000
+"""
+
+import argparse
+import asyncio
+import json
+import time
+
+from guara import security
+from guara.cache import MemoryCache
+
+
+async def time_per_request(token: str, requests: int) -> float:
+    start = time.perf_counter()
+    for _ in range(requests):
+        await security.get_current_identity(None, token)
+    return round((time.perf_counter() - start) * 1_000_000 / requests, 3)
+
+
+async def run(requests: int) -> dict:
+    token = security.create_access_token({
+        'sub': 'bench@test.com',
+        'uid': 1,
+        'ver': 0,
+    })
+    saved = (
+        security.settings.AUTH_STATELESS,
+        security.token_cache,
+        security.token_revocations.backend,
+    )
+    security.settings.AUTH_STATELESS = True
+    security.token_revocations.backend = MemoryCache(1)
+    try:
+        security.token_cache = security.TokenCache(0)
+        uncached = await time_per_request(token, requests)
+        security.token_cache = security.TokenCache(1)
+        cached = await time_per_request(token, requests)
+    finally:
+        (
+            security.settings.AUTH_STATELESS,
+            security.token_cache,
+            security.token_revocations.backend,
+        ) = saved
+
+    return {
+        'requests': requests,
+        'uncached_us_per_request': uncached,
+        'cached_us_per_request': cached,
+        'speedup': round(uncached / cached, 2),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--requests', type=int, default=10_000)
+    args = parser.parse_args()
+
+    print(json.dumps(asyncio.run(run(args.requests)), indent=2))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,188 @@
+"""Request mixes driven against the app by ``python -m benchmarks``."""
+
+import asyncio
+import random
+import time
+from http import HTTPStatus
+
+from httpx import AsyncClient
+
+from benchmarks.harness import (
+    PASSWORD,
+    WORDS,
+    Recorder,
+    Seed,
+    login,
+    sample_todo,
+)
+
+
+class Worker:
+    """One simulated client; each public coroutine is one operation."""
+
+    def __init__(
+        self,
+        client: AsyncClient,
+        seed: Seed,
+        rng: random.Random,
+        recorder: Recorder,
+        tokens: dict,
+    ):
+        self.client = client
+        self.seed = seed
+        self.rng = rng
+        self.recorder = recorder
+        self.tokens = tokens
+        self.created: list[tuple[int, int]] = []
+
+    async def _account(self) -> tuple[int, dict]:
+        user_id, _ = self.rng.choice(self.seed.users)
+        return user_id, self.tokens[user_id]
+
+    async def _request(self, endpoint: str, method: str, url: str, **kwargs):
+        async with self.recorder.measure(endpoint):
+            response = await self.client.request(method, url, **kwargs)
+        if response.status_code >= HTTPStatus.BAD_REQUEST:
+            self.recorder.fail(endpoint)
+        return response
+
+    async def login(self):
+        _, email = self.rng.choice(self.seed.users)
+        await self._request(
+            'POST /auth/token',
+            'POST',
+            '/auth/token',
+            data={'username': email, 'password': PASSWORD},
+        )
+
+    async def list_todos(self):
+        _, headers = await self._account()
+        await self._request(
+            'GET /todos/',
+            'GET',
+            '/todos/',
+            params={'limit': 50},
+            headers=headers,
+        )
+
+    async def filter_todos(self):
+        _, headers = await self._account()
+        await self._request(
+            'GET /todos/?state',
+            'GET',
+            '/todos/',
+            params={'limit': 50, 'state': self.rng.choice(['todo', 'doing'])},
+            headers=headers,
+        )
+
+    async def search_todos(self):
+        _, headers = await self._account()
+        await self._request(
+            'GET /todos/search',
+            'GET',
+            '/todos/search',
+            params={'q': self.rng.choice(WORDS), 'limit': 20},
+            headers=headers,
+        )
+
+    async def get_user(self):
+        user_id, _ = self.rng.choice(self.seed.users)
+        await self._request('GET /users/{user_id}', 'GET', f'/users/{user_id}')
+
+    async def create_todo(self):
+        user_id, headers = await self._account()
+        response = await self._request(
+            'POST /todos/',
+            'POST',
+            '/todos/',
+            json=sample_todo(self.rng),
+            headers=headers,
+        )
+        if response.status_code == HTTPStatus.OK:
+            self.created.append((user_id, response.json()['id']))
+
+    async def update_todo(self):
+        user_id, headers = await self._account()
+        todo_id = self.rng.choice(self.seed.todo_ids[user_id])
+        await self._request(
+            'PATCH /todos/{todo_id}',
+            'PATCH',
+            f'/todos/{todo_id}',
+            json={'state': self.rng.choice(['todo', 'doing', 'done'])},
+            headers=headers,
+        )
+
+    async def delete_todo(self):
+        # only delete rows this worker created, so seeded ids stay valid
+        if not self.created:
+            return await self.create_todo()
+        user_id, todo_id = self.created.pop()
+        await self._request(
+            'DELETE /todos/{todo_id}',
+            'DELETE',
+            f'/todos/{todo_id}',
+            headers=self.tokens[user_id],
+        )
+
+
+WORKLOADS = {
+    'login-storm': {'login': 1},
+    'list-heavy': {
+        'list_todos': 6,
+        'filter_todos': 2,
+        'search_todos': 1,
+        'get_user': 1,
+    },
+    'write-heavy': {'create_todo': 4, 'update_todo': 4, 'delete_todo': 2},
+    'mixed': {
+        'login': 1,
+        'list_todos': 8,
+        'filter_todos': 2,
+        'search_todos': 1,
+        'get_user': 2,
+        'create_todo': 2,
+        'update_todo': 3,
+        'delete_todo': 1,
+    },
+}
+
+
+async def run_workload(  # noqa: PLR0913
+    client: AsyncClient,
+    seed: Seed,
+    workload: str,
+    *,
+    concurrency: int,
+    duration: float | None = None,
+    requests: int | None = None,
+    rng_seed: int = 0,
+) -> dict:
+    """Drive ``workload`` until ``duration`` seconds or ``requests`` pass."""
+    operations = list(WORKLOADS[workload])
+    weights = list(WORKLOADS[workload].values())
+    # log every account in up front so token setup stays out of the timings
+    tokens = {
+        user_id: await login(client, email) for user_id, email in seed.users
+    }
+    deadline = time.perf_counter() + duration if duration else None
+    remaining = requests
+    recorder = Recorder()
+
+    def more() -> bool:
+        nonlocal remaining
+        if deadline and time.perf_counter() >= deadline:
+            return False
+        if remaining is not None:
+            if remaining <= 0:
+                return False
+            remaining -= 1
+        return True
+
+    async def worker(index: int):
+        rng = random.Random(rng_seed * 1000 + index)
+        state = Worker(client, seed, rng, recorder, tokens)
+        while more():
+            await getattr(state, rng.choices(operations, weights)[0])()
+
+    await asyncio.gather(*(worker(n) for n in range(concurrency)))
+    return recorder.report()
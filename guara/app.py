@@ -1,12 +1,104 @@
+import asyncio
+import contextlib
 from http import HTTPStatus
 
 from fastapi import FastAPI
-from fastapi.responses import HTMLResponse
+from fastapi.responses import HTMLResponse, PlainTextResponse
 
+from guara import metrics
+from guara.cache import user_cache
+from guara.database import (
+    dispose_engines,
+    get_engine,
+    get_replicas,
+    pool_stats,
+)
+from guara.ratelimit import login_limiter
+from guara.replicas import recent_writes
+from guara.retention import trash_purger
 from guara.routers import auth, todos, users
 from guara.schemas import Message
+from guara.security import (
+    get_password_context,
+    password_hasher,
+    token_cache,
+    token_revocations,
+)
+from guara.settings import get_settings
 
-app = FastAPI()
+settings = get_settings()
+
+
+@contextlib.asynccontextmanager
+async def lifespan(app: FastAPI):
+    # built here rather than at import so tooling that only imports the
+    # app (the CLI, migrations, tests) doesn't pay for them
+    engine = get_engine()
+    get_replicas()
+    get_password_context()
+
+    purge = None
+    if settings.TRASH_PURGE_INTERVAL:
+        purge = asyncio.create_task(
+            trash_purger.run_forever(engine, settings.TRASH_PURGE_INTERVAL)
+        )
+
+    yield
+
+    if purge:
+        purge.cancel()
+        with contextlib.suppress(asyncio.CancelledError):
+            await purge
+
+    await dispose_engines()
+
+
+app = FastAPI(lifespan=lifespan)
+app.add_middleware(metrics.MetricsMiddleware)
+
+metrics.register(
+    metrics.GaugeCallback('db_pool', 'Connection pool state.', pool_stats)
+)
+metrics.register(
+    metrics.GaugeCallback(
+        'password_hasher',
+        'Argon2 executor state.',
+        password_hasher.stats,
+    )
+)
+
+metrics.register(
+    metrics.GaugeCallback(
+        'user_cache', 'User cache lookups.', user_cache.stats
+    )
+)
+metrics.register(
+    metrics.GaugeCallback(
+        'read_routing', 'Reads sent to replicas.', recent_writes.stats
+    )
+)
+metrics.register(
+    metrics.GaugeCallback(
+        'login_limiter', 'Login admission control.', login_limiter.stats
+    )
+)
+metrics.register(
+    metrics.GaugeCallback(
+        'token_revocations',
+        'Stateless tokens refused as revoked.',
+        token_revocations.stats,
+    )
+)
+metrics.register(
+    metrics.GaugeCallback(
+        'token_cache', 'Verified token claims reused.', token_cache.stats
+    )
+)
+metrics.register(
+    metrics.GaugeCallback(
+        'trash_purge', 'Trashed todos purged.', trash_purger.stats
+    )
+)
 
 app.include_router(users.router)
 app.include_router(auth.router)
@@ -30,3 +122,17 @@ def read_root_html():
         </body>
     </html>
     """
+
+
+@app.get(
+    '/stats/pool', status_code=HTTPStatus.OK, response_model=dict[str, float]
+)
+def read_pool_stats():
+    return pool_stats()
+
+
+@app.get('/metrics', response_class=PlainTextResponse)
+def read_metrics():
+    return PlainTextResponse(
+        metrics.render(), media_type='text/plain; version=0.0.4'
+    )
@@ -0,0 +1,270 @@
+import asyncio
+import time
+from collections import OrderedDict
+from datetime import datetime
+from urllib.parse import urlsplit
+
+from pydantic_core import from_json, to_json
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import make_transient_to_detached
+
+from guara.models import User
+from guara.settings import get_settings
+
+settings = get_settings()
+
+
+class NullCache:
+    """Backend that stores nothing; every lookup is a miss."""
+
+    @staticmethod
+    async def get(key: str) -> bytes | None:
+        return None
+
+    @staticmethod
+    async def set(key: str, value: bytes, ttl: float):
+        pass
+
+    @staticmethod
+    async def delete(*keys: str):
+        pass
+
+
+class MemoryCache:
+    """In-process LRU with a per-entry TTL.
+
+    Entries live in the worker that wrote them, so an invalidation only
+    reaches the worker that handled the write; other workers keep serving
+    their copy until its TTL runs out.
+    """
+
+    def __init__(self, maxsize: int):
+        self.maxsize = maxsize
+        self._entries: OrderedDict[str, tuple[float, bytes]] = OrderedDict()
+
+    async def get(self, key: str) -> bytes | None:
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+
+        expires, value = entry
+        if expires <= time.monotonic():
+            del self._entries[key]
+            return None
+
+        self._entries.move_to_end(key)
+        return value
+
+    async def set(self, key: str, value: bytes, ttl: float):
+        self._entries[key] = (time.monotonic() + ttl, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
+
+    async def delete(self, *keys: str):
+        for key in keys:
+            self._entries.pop(key, None)
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+class RedisError(Exception):
+    pass
+
+
+class RedisCache:
+    """Backend speaking the Redis protocol (RESP) over one connection.
+
+    Commands are serialized on a lock, which is plenty for GET/SET/DEL of
+    small values. Shared by every worker, so invalidations are seen
+    everywhere at once. A command that can't finish within ``timeout``
+    seconds, waiting for the lock included, raises ``TimeoutError`` (an
+    ``OSError``), so a stalled server degrades like an unreachable one.
+    """
+
+    def __init__(self, url: str, timeout: float = 1):
+        parts = urlsplit(url)
+        self.host = parts.hostname or 'localhost'
+        self.port = parts.port or 6379
+        self.password = parts.password
+        self.db = int(parts.path.lstrip('/') or 0)
+        self.timeout = timeout
+        self._lock = asyncio.Lock()
+        self._reader = self._writer = None
+
+    async def _connect(self):
+        self._reader, self._writer = await asyncio.open_connection(
+            self.host, self.port
+        )
+        if self.password:
+            await self._send('AUTH', self.password)
+        if self.db:
+            await self._send('SELECT', self.db)
+
+    async def _read_reply(self):
+        line = await self._reader.readline()
+        if not line:
+            raise ConnectionError('Connection closed by server')
+
+        kind, rest = line[:1], line[1:-2]
+        if kind == b'+':
+            return rest.decode()
+        if kind == b'-':
+            raise RedisError(rest.decode())
+        if kind == b':':
+            return int(rest)
+        if kind == b'$':
+            length = int(rest)
+            if length < 0:
+                return None
+            return (await self._reader.readexactly(length + 2))[:-2]
+        if kind == b'*':
+            return [await self._read_reply() for _ in range(int(rest))]
+        raise RedisError(f'Unexpected reply: {line!r}')
+
+    async def _send(self, *args):
+        parts = [f'*{len(args)}\r\n'.encode()]
+        for arg in args:
+            data = arg if isinstance(arg, bytes) else str(arg).encode()
+            parts += [f'${len(data)}\r\n'.encode(), data, b'\r\n']
+        self._writer.write(b''.join(parts))
+        await self._writer.drain()
+        return await self._read_reply()
+
+    async def execute(self, *args):
+        async with asyncio.timeout(self.timeout), self._lock:
+            try:
+                if self._writer is None:
+                    await self._connect()
+                return await self._send(*args)
+            except BaseException:
+                # Whatever cut the command short (an error, the timeout, the
+                # caller being cancelled) may have left its reply unread, to
+                # be taken by the next command as its own. Drop the
+                # connection instead; the next command reconnects.
+                if self._writer is not None:
+                    self._writer.close()
+                self._reader = self._writer = None
+                raise
+
+    async def get(self, key: str) -> bytes | None:
+        return await self.execute('GET', key)
+
+    async def set(self, key: str, value: bytes, ttl: float):
+        await self.execute('SET', key, value, 'PX', int(ttl * 1000))
+
+    async def delete(self, *keys: str):
+        await self.execute('DEL', *keys)
+
+
+BACKENDS = {
+    'none': lambda settings: NullCache(),
+    'memory': lambda settings: MemoryCache(settings.USER_CACHE_SIZE),
+    'redis': lambda settings: RedisCache(
+        settings.USER_CACHE_URL, settings.REDIS_TIMEOUT
+    ),
+}
+
+# The password hash is left out on purpose: it never leaves the database
+# for a shared cache, and nothing that uses the current user reads it.
+USER_FIELDS = (
+    'id',
+    'username',
+    'email',
+    'token_version',
+    'created_at',
+    'updated_at',
+)
+
+
+class UserCache:
+    """Caches user rows by id and by email, invalidated on every write.
+
+    A backend that errors out counts as a miss, so a cache outage costs
+    a SELECT instead of failing the request.
+    """
+
+    def __init__(self, backend, ttl: float):
+        self.backend = backend
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self.errors = 0
+
+    @staticmethod
+    def _keys(user_id: int, email: str) -> tuple[str, str]:
+        return f'user:id:{user_id}', f'user:email:{email}'
+
+    async def _get(self, key: str) -> dict | None:
+        try:
+            value = await self.backend.get(key)
+        except (OSError, RedisError):
+            self.errors += 1
+            value = None
+
+        data = None if value is None else from_json(value)
+        # entries written by a release with other fields count as misses
+        if data is None or len(data) != len(USER_FIELDS):
+            self.misses += 1
+            return None
+
+        self.hits += 1
+        return data
+
+    async def get_by_id(self, user_id: int) -> dict | None:
+        return await self._get(f'user:id:{user_id}')
+
+    async def get_by_email(self, email: str) -> dict | None:
+        return await self._get(f'user:email:{email}')
+
+    async def set(self, user: User):
+        value = to_json({field: getattr(user, field) for field in USER_FIELDS})
+        try:
+            for key in self._keys(user.id, user.email):
+                await self.backend.set(key, value, self.ttl)
+        except (OSError, RedisError):
+            self.errors += 1
+
+    async def invalidate(self, user_id: int, email: str):
+        try:
+            await self.backend.delete(*self._keys(user_id, email))
+        except (OSError, RedisError):
+            self.errors += 1
+
+    def stats(self) -> dict:
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'errors': self.errors,
+        }
+
+
+async def attach_user(session: AsyncSession, data: dict) -> User:
+    """Turn a cached row into a persistent ``User`` without a SELECT.
+
+    The instance is marked as loaded from the database and merged into the
+    session, so updates and deletes through it work as usual.
+    """
+    user = User(username=data['username'], password=None, email=data['email'])
+    user.id = data['id']
+    user.token_version = data['token_version']
+    user.created_at = datetime.fromisoformat(data['created_at'])
+    user.updated_at = datetime.fromisoformat(data['updated_at'])
+    del user.password
+    make_transient_to_detached(user)
+    return await session.merge(user, load=False)
+
+
+user_cache = UserCache(
+    BACKENDS[settings.USER_CACHE_BACKEND](settings), settings.USER_CACHE_TTL
+)
+
+# Token revocations, read-your-writes marks and deletion progress share
+# one backend, and with Redis one connection. It is the user cache's
+# Redis server when it has one, so every worker sees the same state.
+# Otherwise it is this worker's memory: state only covers the worker that
+# wrote it and is lost on restart.
+shared_state = BACKENDS[
+    'redis' if settings.USER_CACHE_BACKEND == 'redis' else 'memory'
+](settings)
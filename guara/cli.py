@@ -0,0 +1,133 @@
+"""Maintenance commands, run as ``python -m guara.cli <command>``."""
+
+import argparse
+import asyncio
+
+from guara.counters import reconcile_counters
+from guara.database import dispose_engines, get_engine
+from guara.retention import TrashPurger
+from guara.security import calibrate_hashing
+from guara.settings import get_settings
+from guara.startup import profile_startup, report
+
+
+async def reconcile(args):
+    async with get_engine().begin() as connection:
+        rows = await reconcile_counters(connection)
+    print(f'Rebuilt {rows} todo counters')
+
+
+async def purge_trash(args):
+    purger = TrashPurger(args.retention_days, args.batch_size, args.pause)
+    rows = await purger.run(get_engine())
+    print(f'Purged {rows} trashed todos')
+
+
+async def calibrate(args):
+    result = calibrate_hashing(
+        args.target_ms / 1000,
+        args.max_memory_mib * 1024,
+        args.workers,
+        args.parallelism,
+    )
+    seconds = result.pop('seconds')
+    for name, value in result.items():
+        print(f'{name}={value}')
+    print(f'# {seconds * 1000:.0f} ms per hash on this host')
+
+
+async def startup(args):
+    modules, timings = profile_startup()
+    print('\n'.join(report(modules, timings, args.top)))
+
+
+async def run(handler, args):
+    try:
+        await handler(args)
+    finally:
+        await dispose_engines()
+
+
+def main(argv=None):
+    settings = get_settings()
+    parser = argparse.ArgumentParser(prog='guara', description=__doc__)
+    commands = parser.add_subparsers(required=True)
+
+    reconcile_parser = commands.add_parser(
+        'reconcile-counters',
+        help='rebuild the per-state todo counters from the todos table',
+    )
+    reconcile_parser.set_defaults(handler=reconcile)
+
+    purge_parser = commands.add_parser(
+        'purge-trash',
+        help='delete todos that have been in the trash past retention',
+    )
+    purge_parser.add_argument(
+        '--retention-days',
+        type=float,
+        default=settings.TRASH_RETENTION_DAYS,
+        help='how long trashed todos are kept',
+    )
+    purge_parser.add_argument(
+        '--batch-size',
+        type=int,
+        default=settings.TRASH_PURGE_BATCH_SIZE,
+        help='rows deleted per transaction',
+    )
+    purge_parser.add_argument(
+        '--pause',
+        type=float,
+        default=settings.TRASH_PURGE_PAUSE,
+        help='seconds to wait between batches',
+    )
+    purge_parser.set_defaults(handler=purge_trash)
+
+    calibrate_parser = commands.add_parser(
+        'calibrate-hashing',
+        help='suggest Argon2 costs for a target login latency on this host',
+    )
+    calibrate_parser.add_argument(
+        '--target-ms',
+        type=float,
+        default=250,
+        help='longest a single hash may take',
+    )
+    calibrate_parser.add_argument(
+        '--max-memory-mib',
+        type=int,
+        default=256,
+        help='Argon2 memory a worker process may hold across its hashes',
+    )
+    calibrate_parser.add_argument(
+        '--workers',
+        type=int,
+        default=settings.PASSWORD_HASH_WORKERS,
+        help='concurrent hashes per process (PASSWORD_HASH_WORKERS)',
+    )
+    calibrate_parser.add_argument(
+        '--parallelism',
+        type=int,
+        default=settings.PASSWORD_HASH_PARALLELISM,
+        help='Argon2 lanes per hash',
+    )
+    calibrate_parser.set_defaults(handler=calibrate)
+
+    startup_parser = commands.add_parser(
+        'profile-startup',
+        help='time module imports and lazy initialization in a fresh worker',
+    )
+    startup_parser.add_argument(
+        '--top',
+        type=int,
+        default=15,
+        help='how many of the slowest third-party imports to list',
+    )
+    startup_parser.set_defaults(handler=startup)
+
+    args = parser.parse_args(argv)
+    asyncio.run(run(args.handler, args))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,139 @@
+from sqlalchemy import DDL, delete, event, func, insert, select, text
+from sqlalchemy.ext.asyncio import AsyncConnection, AsyncSession
+
+from guara.models import Todo, TodoCounter, TodoState, table_registry
+
+# todo_counters is maintained inside the writing transaction by triggers
+# on todos, so every path that touches todos (single and bulk endpoints,
+# COPY imports, cascades) keeps it exact without the app's help.
+#
+# Postgres uses statement-level triggers with transition tables: a bulk
+# write is folded into one upsert per (user, state) instead of one per
+# row. Keys are upserted in order so concurrent writers can't deadlock.
+POSTGRES_UPSERT = """
+    INSERT INTO todo_counters (user_id, state, count)
+    SELECT user_id, state, sum(delta) FROM ({changes}) AS changes
+    GROUP BY user_id, state
+    HAVING sum(delta) <> 0
+    ORDER BY user_id, state
+    ON CONFLICT (user_id, state)
+    DO UPDATE SET count = todo_counters.count + excluded.count
+"""
+
+POSTGRES_TRIGGERS = {
+    'insert': (
+        'NEW TABLE AS new_rows',
+        'SELECT user_id, state, 1 AS delta FROM new_rows',
+    ),
+    'delete': (
+        'OLD TABLE AS old_rows',
+        'SELECT user_id, state, -1 AS delta FROM old_rows',
+    ),
+    'update': (
+        'OLD TABLE AS old_rows NEW TABLE AS new_rows',
+        'SELECT user_id, state, 1 AS delta FROM new_rows '
+        'UNION ALL SELECT user_id, state, -1 FROM old_rows',
+    ),
+}
+
+POSTGRES_DDL = [
+    statement
+    for operation, (transition, changes) in POSTGRES_TRIGGERS.items()
+    for statement in (
+        f"""
+        CREATE OR REPLACE FUNCTION todo_counters_{operation}()
+        RETURNS trigger LANGUAGE plpgsql AS $$
+        BEGIN
+            {POSTGRES_UPSERT.format(changes=changes)};
+            RETURN NULL;
+        END
+        $$
+        """,
+        f"""
+        CREATE TRIGGER todo_counters_{operation}
+        AFTER {operation.upper()} ON todos
+        REFERENCING {transition}
+        FOR EACH STATEMENT EXECUTE FUNCTION todo_counters_{operation}()
+        """,
+    )
+]
+
+SQLITE_UPSERT = """
+    INSERT INTO todo_counters (user_id, state, count)
+    VALUES ({row}.user_id, {row}.state, {delta})
+    ON CONFLICT (user_id, state)
+    DO UPDATE SET count = todo_counters.count + excluded.count;
+"""
+
+SQLITE_DDL = (
+    f"""
+    CREATE TRIGGER todo_counters_insert AFTER INSERT ON todos BEGIN
+        {SQLITE_UPSERT.format(row='new', delta=1)}
+    END
+    """,
+    f"""
+    CREATE TRIGGER todo_counters_delete AFTER DELETE ON todos BEGIN
+        {SQLITE_UPSERT.format(row='old', delta=-1)}
+    END
+    """,
+    f"""
+    CREATE TRIGGER todo_counters_update AFTER UPDATE OF state, user_id
+    ON todos
+    WHEN old.state IS NOT new.state OR old.user_id IS NOT new.user_id
+    BEGIN
+        {SQLITE_UPSERT.format(row='old', delta=-1)}
+        {SQLITE_UPSERT.format(row='new', delta=1)}
+    END
+    """,
+)
+
+# Registered on the metadata so both tables exist before the triggers.
+for statement in POSTGRES_DDL:
+    event.listen(
+        table_registry.metadata,
+        'after_create',
+        DDL(statement).execute_if(dialect='postgresql'),
+    )
+
+for statement in SQLITE_DDL:
+    event.listen(
+        table_registry.metadata,
+        'after_create',
+        DDL(statement).execute_if(dialect='sqlite'),
+    )
+
+for operation in POSTGRES_TRIGGERS:
+    event.listen(
+        table_registry.metadata,
+        'after_drop',
+        DDL(f'DROP FUNCTION IF EXISTS todo_counters_{operation}()').execute_if(
+            dialect='postgresql'
+        ),
+    )
+
+
+async def todo_counts(session: AsyncSession, user_id: int) -> dict:
+    rows = await session.execute(
+        select(TodoCounter.state, TodoCounter.count).where(
+            TodoCounter.user_id == user_id
+        )
+    )
+    return dict.fromkeys(TodoState, 0) | dict(rows.all())
+
+
+async def reconcile_counters(connection: AsyncConnection) -> int:
+    """Rebuild todo_counters from todos; returns the number of rows."""
+    if connection.dialect.name == 'postgresql':
+        # keep writers (and so the triggers) out until the rebuild commits
+        await connection.execute(text('LOCK TABLE todos IN SHARE MODE'))
+
+    await connection.execute(delete(TodoCounter))
+    result = await connection.execute(
+        insert(TodoCounter).from_select(
+            ['user_id', 'state', 'count'],
+            select(Todo.user_id, Todo.state, func.count()).group_by(
+                Todo.user_id, Todo.state
+            ),
+        )
+    )
+    return result.rowcount
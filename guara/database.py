@@ -1,10 +1,133 @@
-from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+import functools
+import itertools
+import time
 
-from guara.settings import Settings
+from fastapi import Depends
+from sqlalchemy import exc
+from sqlalchemy.ext.asyncio import (
+    AsyncEngine,
+    AsyncSession,
+    create_async_engine,
+)
+from sqlalchemy.pool import AsyncAdaptedQueuePool, NullPool
 
-engine = create_async_engine(Settings().DATABASE_URL)
+from guara.settings import Settings, get_settings
+
+
+class InstrumentedPool(AsyncAdaptedQueuePool):
+    """Queue pool that also records how long checkouts take."""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.checkouts = 0
+        self.timeouts = 0
+        self.wait_seconds_total = 0.0
+        self.wait_seconds_max = 0.0
+
+    def connect(self):
+        start = time.perf_counter()
+        try:
+            return super().connect()
+        except exc.TimeoutError:
+            self.timeouts += 1
+            raise
+        finally:
+            waited = time.perf_counter() - start
+            self.checkouts += 1
+            self.wait_seconds_total += waited
+            self.wait_seconds_max = max(self.wait_seconds_max, waited)
+
+    def stats(self) -> dict:
+        return {
+            'size': self.size(),
+            'checked_in': self.checkedin(),
+            'checked_out': self.checkedout(),
+            'overflow': max(self.overflow(), 0),
+            'checkouts': self.checkouts,
+            'timeouts': self.timeouts,
+            'wait_seconds_total': self.wait_seconds_total,
+            'wait_seconds_max': self.wait_seconds_max,
+        }
+
+
+def engine_options(settings: Settings) -> dict:
+    options = {'pool_pre_ping': settings.DATABASE_POOL_PRE_PING}
+
+    if settings.DATABASE_DISABLE_PREPARED_STATEMENTS:
+        # Transaction-pooling pgbouncer can't route prepared statements.
+        options['connect_args'] = {'prepare_threshold': None}
+
+    if settings.DATABASE_NULL_POOL:
+        options['poolclass'] = NullPool
+        return options
+
+    return options | {
+        'poolclass': InstrumentedPool,
+        'pool_size': settings.DATABASE_POOL_SIZE,
+        'max_overflow': settings.DATABASE_MAX_OVERFLOW,
+        'pool_timeout': settings.DATABASE_POOL_TIMEOUT,
+        'pool_recycle': settings.DATABASE_POOL_RECYCLE,
+    }
+
+
+@functools.cache
+def get_engine() -> AsyncEngine:
+    """The primary's engine, built on first use.
+
+    Building it imports the dialect and driver, so it is left out of
+    ``import guara``; the app's lifespan builds it before serving.
+    """
+    settings = get_settings()
+    return create_async_engine(
+        settings.DATABASE_URL, **engine_options(settings)
+    )
+
+
+@functools.cache
+def get_replicas() -> tuple[AsyncEngine, ...]:
+    settings = get_settings()
+    return tuple(
+        create_async_engine(url, **engine_options(settings))
+        for url in settings.DATABASE_REPLICA_URLS
+    )
+
+
+@functools.cache
+def _replica_cycle():
+    return itertools.cycle(get_replicas())
+
+
+async def dispose_engines():
+    """Close the pools of whichever engines have been built."""
+    if get_engine.cache_info().currsize:
+        await get_engine().dispose()
+    if get_replicas.cache_info().currsize:
+        for replica in get_replicas():
+            await replica.dispose()
+
+
+def pool_stats() -> dict:
+    pool = get_engine().pool
+    if isinstance(pool, InstrumentedPool):
+        return pool.stats()
+    return {}
 
 
 async def get_session():  # pragma: no cover
-    async with AsyncSession(engine, expire_on_commit=False) as session:
+    async with AsyncSession(get_engine(), expire_on_commit=False) as session:
+        yield session
+
+
+async def get_replica_session(
+    session: AsyncSession = Depends(get_session),
+):  # pragma: no cover
+    # Without replicas, reads share the request's primary session.
+    if not get_replicas():
         yield session
+        return
+
+    replica = next(_replica_cycle())
+    async with AsyncSession(
+        replica, expire_on_commit=False
+    ) as replica_session:
+        yield replica_session
@@ -0,0 +1,128 @@
+import secrets
+
+from pydantic_core import from_json, to_json
+from sqlalchemy import delete, select
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession
+
+from guara.cache import RedisError, shared_state
+from guara.models import Todo, User
+from guara.settings import get_settings
+
+settings = get_settings()
+
+# How long a finished job's progress can still be read back.
+PROGRESS_TTL = 24 * 60 * 60
+# How long a running job may go without finishing a batch before it is
+# taken for dead.
+LEASE_TTL = 60
+
+
+async def delete_todo_batch(
+    session: AsyncSession, user_id: int, batch_size: int
+) -> int:
+    """Delete up to ``batch_size`` of a user's todos; returns how many."""
+    batch = (
+        select(Todo.id)
+        .where(Todo.user_id == user_id)
+        .limit(batch_size)
+        .scalar_subquery()
+    )
+    result = await session.execute(
+        # user_id again, so a partitioned todos only touches one partition
+        delete(Todo).where(Todo.user_id == user_id, Todo.id.in_(batch)),
+        execution_options={'synchronize_session': False},
+    )
+    return result.rowcount
+
+
+class DeletionJobs:
+    """Deletes heavy accounts in the background, one batch per transaction.
+
+    Each batch commits on its own, so no transaction holds locks on more
+    than ``batch_size`` todos and the connection is handed back between
+    batches. The user row goes last; the ``ON DELETE CASCADE`` on
+    ``todos.user_id`` takes whatever was added meanwhile. Progress is kept
+    in ``guara.cache.shared_state``. A running job holds a lease it renews
+    after every batch. If its worker dies, the lease runs out, and
+    deleting the user again starts a new job that picks up where the old
+    one stopped. Progress is only handed out
+    against the job's random id, so nobody else can learn that an account
+    is going away.
+    """
+
+    def __init__(self, backend, batch_size: int, lease: float = LEASE_TTL):
+        self.backend = backend
+        self.batch_size = batch_size
+        self.lease = lease
+
+    async def _save(self, progress: dict):
+        user_id = progress['user_id']
+        try:
+            await self.backend.set(
+                f'deletion:{user_id}', to_json(progress), PROGRESS_TTL
+            )
+            if progress['status'] == 'running':
+                await self.backend.set(
+                    f'deletion:lease:{user_id}', b'1', self.lease
+                )
+        except (OSError, RedisError):
+            pass
+
+    async def progress(self, user_id: int) -> dict | None:
+        try:
+            value = await self.backend.get(f'deletion:{user_id}')
+        except (OSError, RedisError):
+            return None
+        return None if value is None else from_json(value)
+
+    async def running(self, user_id: int) -> dict | None:
+        """The user's job, if one is running on a live worker."""
+        progress = await self.progress(user_id)
+        if not progress or progress['status'] != 'running':
+            return None
+        try:
+            alive = await self.backend.get(f'deletion:lease:{user_id}')
+        except (OSError, RedisError):
+            return None
+        return progress if alive else None
+
+    async def start(self, user_id: int, total: int) -> dict:
+        progress = {
+            'job_id': secrets.token_urlsafe(16),
+            'user_id': user_id,
+            'status': 'running',
+            'total': total,
+            'deleted': 0,
+        }
+        await self._save(progress)
+        return progress
+
+    async def _delete(self, session: AsyncSession, progress: dict):
+        user_id = progress['user_id']
+        while deleted := await delete_todo_batch(
+            session, user_id, self.batch_size
+        ):
+            await session.commit()
+            progress['deleted'] += deleted
+            await self._save(progress)
+
+        await session.execute(delete(User).where(User.id == user_id))
+        await session.commit()
+
+    async def run(self, engine: AsyncEngine, progress: dict):
+        async with AsyncSession(engine) as session:
+            try:
+                await self._delete(session, progress)
+            except Exception:
+                progress['status'] = 'failed'
+                await self._save(progress)
+                raise
+
+        progress['status'] = 'done'
+        await self._save(progress)
+
+
+deletion_jobs = DeletionJobs(
+    shared_state,
+    settings.USER_DELETE_BATCH_SIZE,
+)
@@ -0,0 +1,41 @@
+import hashlib
+from http import HTTPStatus
+
+from fastapi.responses import Response
+
+# Todo pages are fingerprinted by the (id, updated_at) of their rows, so a
+# poll can be answered from a narrow query before any full row is loaded
+# or serialized. Inserts and deletes change the ids on a page and every
+# write bumps updated_at; note SQLite's now() only has one-second
+# resolution, so two edits within the same second share a tag there.
+
+
+def make_etag(values) -> str:
+    digest = hashlib.blake2b(digest_size=16)
+    for value in values:
+        digest.update(repr(value).encode())
+        digest.update(b'\0')
+    return f'"{digest.hexdigest()}"'
+
+
+def page_etag(rows, next_cursor: str | None) -> str:
+    return make_etag([
+        next_cursor,
+        *((row.id, row.updated_at) for row in rows),
+    ])
+
+
+def etag_matches(if_none_match: str | None, etag: str) -> bool:
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == '*':
+        return True
+    # If-None-Match uses the weak comparison, so W/ prefixes are ignored.
+    tags = {tag.strip().removeprefix('W/') for tag in if_none_match.split(',')}
+    return etag in tags
+
+
+def not_modified(etag: str) -> Response:
+    return Response(
+        status_code=HTTPStatus.NOT_MODIFIED, headers={'ETag': etag}
+    )
@@ -0,0 +1,98 @@
+import csv
+import io
+from collections.abc import Iterator
+from typing import BinaryIO
+
+from pydantic import ValidationError
+from sqlalchemy import insert
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from guara.models import Todo
+from guara.schemas import (
+    FileFormat,
+    TodoImportError,
+    TodoImportResult,
+    TodoSchema,
+)
+
+# Uploads are read a batch at a time: parsing and validation run off the
+# event loop, then the batch goes to the database in one statement (COPY
+# on psycopg, a multi-row INSERT elsewhere). Only the first
+# MAX_REPORTED_ERRORS rejections are kept so a bad file can't grow the
+# response without bound; the rejected count is always exact.
+BATCH_SIZE = 5000
+MAX_REPORTED_ERRORS = 100
+COPY_TODOS = 'COPY todos (title, description, state, user_id) FROM STDIN'
+
+
+def _describe(error: ValidationError) -> str:
+    return '; '.join(
+        f'{".".join(map(str, detail["loc"])) or "row"}: {detail["msg"]}'
+        for detail in error.errors(include_url=False)
+    )
+
+
+def parse_todos(
+    file: BinaryIO, file_format: FileFormat
+) -> Iterator[tuple[int, TodoSchema | ValidationError]]:
+    """Yield ``(line, todo or error)`` for each record of an upload."""
+    text = io.TextIOWrapper(file, encoding='utf-8', newline='')
+
+    if file_format == 'csv':
+        reader = csv.DictReader(text)
+        for record in reader:
+            try:
+                yield reader.line_num, TodoSchema.model_validate(record)
+            except ValidationError as error:
+                yield reader.line_num, error
+        return
+
+    for line, raw in enumerate(text, start=1):
+        if not raw.strip():
+            continue
+        try:
+            yield line, TodoSchema.model_validate_json(raw)
+        except ValidationError as error:
+            yield line, error
+
+
+def read_batch(todos: Iterator, result: TodoImportResult) -> list[TodoSchema]:
+    """Pull up to ``BATCH_SIZE`` valid todos, tallying rejections."""
+    batch = []
+    for line, todo in todos:
+        if isinstance(todo, TodoSchema):
+            batch.append(todo)
+            if len(batch) == BATCH_SIZE:
+                break
+            continue
+
+        result.rejected += 1
+        if len(result.errors) < MAX_REPORTED_ERRORS:
+            result.errors.append(
+                TodoImportError(line=line, detail=_describe(todo))
+            )
+
+    return batch
+
+
+async def insert_batch(
+    session: AsyncSession, user_id: int, todos: list[TodoSchema]
+):
+    if session.bind.dialect.driver == 'psycopg':
+        connection = await session.connection()
+        raw = await connection.get_raw_connection()
+        async with raw.driver_connection.cursor() as cursor:
+            async with cursor.copy(COPY_TODOS) as copy:
+                for todo in todos:
+                    await copy.write_row((
+                        todo.title,
+                        todo.description,
+                        todo.state.value,
+                        user_id,
+                    ))
+        return
+
+    await session.execute(
+        insert(Todo),
+        [todo.model_dump() | {'user_id': user_id} for todo in todos],
+    )
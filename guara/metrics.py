@@ -0,0 +1,222 @@
+"""Minimal Prometheus-compatible metrics.
+
+Histograms keep one bucket array per label set behind a lock, so an
+observation is a bisect plus three additions. Gauges are read from
+callbacks at scrape time and cost nothing between scrapes.
+"""
+
+import re
+import threading
+import time
+from bisect import bisect_left
+from collections.abc import Callable
+from contextlib import contextmanager
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+BUCKETS = (
+    0.001,
+    0.0025,
+    0.005,
+    0.01,
+    0.025,
+    0.05,
+    0.1,
+    0.25,
+    0.5,
+    1.0,
+    2.5,
+    5.0,
+    10.0,
+)
+
+
+def _labels(names: tuple[str, ...], values: tuple[str, ...], **extra) -> str:
+    pairs = [*zip(names, values), *extra.items()]
+    if not pairs:
+        return ''
+    body = ','.join(
+        '{}="{}"'.format(
+            name,
+            str(value).replace('\\', r'\\').replace('"', r'\"'),
+        )
+        for name, value in pairs
+    )
+    return '{' + body + '}'
+
+
+class Histogram:
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: tuple[str, ...] = (),
+        buckets: tuple[float, ...] = BUCKETS,
+    ):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = labelnames
+        self.buckets = buckets
+        self._series: dict[tuple[str, ...], list[float]] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, amount: float, *labelvalues: str):
+        index = bisect_left(self.buckets, amount)
+        with self._lock:
+            series = self._series.get(labelvalues)
+            if series is None:
+                # one slot per bucket, then +Inf, sum and count
+                series = [0] * (len(self.buckets) + 3)
+                self._series[labelvalues] = series
+            series[index] += 1
+            series[-2] += amount
+            series[-1] += 1
+
+    def render(self) -> list[str]:
+        lines = [
+            f'# HELP {self.name} {self.documentation}',
+            f'# TYPE {self.name} histogram',
+        ]
+        with self._lock:
+            series = {key: list(value) for key, value in self._series.items()}
+
+        for labelvalues, values in sorted(series.items()):
+            cumulative = 0
+            for bound, count in zip((*self.buckets, '+Inf'), values[:-2]):
+                cumulative += count
+                labels = _labels(self.labelnames, labelvalues, le=bound)
+                lines.append(f'{self.name}_bucket{labels} {cumulative}')
+            labels = _labels(self.labelnames, labelvalues)
+            lines.append(f'{self.name}_sum{labels} {values[-2]}')
+            lines.append(f'{self.name}_count{labels} {values[-1]}')
+        return lines
+
+
+class GaugeCallback:
+    def __init__(
+        self,
+        prefix: str,
+        documentation: str,
+        callback: Callable[[], dict],
+    ):
+        self.prefix = prefix
+        self.documentation = documentation
+        self.callback = callback
+
+    def render(self) -> list[str]:
+        lines = []
+        for key, value in self.callback().items():
+            name = f'{self.prefix}_{key}'
+            lines += [
+                f'# HELP {name} {self.documentation}',
+                f'# TYPE {name} gauge',
+                f'{name} {value}',
+            ]
+        return lines
+
+
+@contextmanager
+def timed(histogram: Histogram, *labelvalues: str):
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        histogram.observe(time.perf_counter() - start, *labelvalues)
+
+
+REGISTRY: list[Histogram | GaugeCallback] = []
+
+
+def register(collector):
+    REGISTRY.append(collector)
+    return collector
+
+
+def render() -> str:
+    lines = []
+    for collector in REGISTRY:
+        lines += collector.render()
+    return '\n'.join(lines) + '\n'
+
+
+REQUEST_DURATION = register(
+    Histogram(
+        'http_request_duration_seconds',
+        'HTTP request latency by route template and status.',
+        ('method', 'route', 'status'),
+    )
+)
+DB_STATEMENT_DURATION = register(
+    Histogram(
+        'db_statement_duration_seconds',
+        'Database statement execution time by SQL verb.',
+        ('operation',),
+    )
+)
+PASSWORD_HASH_DURATION = register(
+    Histogram(
+        'password_hash_duration_seconds',
+        'Time spent inside Argon2 hash and verify calls.',
+        ('operation',),
+        buckets=(0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5),
+    )
+)
+
+
+class MetricsMiddleware:
+    """ASGI middleware recording request latency per route template."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] != 'http':
+            return await self.app(scope, receive, send)
+
+        status = 500
+        start = time.perf_counter()
+
+        async def send_wrapper(message):
+            nonlocal status
+            if message['type'] == 'http.response.start':
+                status = message['status']
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            route = scope.get('route')
+            REQUEST_DURATION.observe(
+                time.perf_counter() - start,
+                scope['method'],
+                getattr(route, 'path', '<unmatched>'),
+                str(status),
+            )
+
+
+_VERB = re.compile(r'\s*(\w+)')
+
+
+@event.listens_for(Engine, 'before_cursor_execute')
+def _before_cursor_execute(conn, cursor, statement, *args):
+    conn.info.setdefault('statement_start', []).append(time.perf_counter())
+
+
+@event.listens_for(Engine, 'after_cursor_execute')
+def _after_cursor_execute(conn, cursor, statement, *args):
+    start = conn.info['statement_start'].pop()
+    verb = _VERB.match(statement)
+    DB_STATEMENT_DURATION.observe(
+        time.perf_counter() - start,
+        verb.group(1).upper() if verb else 'OTHER',
+    )
+
+
+@event.listens_for(Engine, 'handle_error')
+def _handle_error(context):
+    starts = context.connection and context.connection.info.get(
+        'statement_start'
+    )
+    if starts:
+        starts.pop()
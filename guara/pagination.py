@@ -0,0 +1,53 @@
+import base64
+import binascii
+from http import HTTPStatus
+
+from fastapi import HTTPException
+from sqlalchemy import Select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import InstrumentedAttribute
+
+from guara.schemas import FilterPage
+
+
+def encode_cursor(key: int) -> str:
+    return base64.urlsafe_b64encode(str(key).encode()).decode()
+
+
+def decode_cursor(cursor: str) -> int:
+    try:
+        return int(base64.urlsafe_b64decode(cursor.encode()))
+    except (binascii.Error, ValueError):
+        raise HTTPException(
+            status_code=HTTPStatus.BAD_REQUEST, detail='Invalid cursor'
+        )
+
+
+async def paginate(
+    session: AsyncSession,
+    query: Select,
+    page: FilterPage,
+    key: InstrumentedAttribute,
+):
+    """Run ``query`` ordered by ``key`` and return ``(rows, next_cursor)``.
+
+    With a cursor the page starts right after the key it encodes, so every
+    page costs one index range scan. Without one the old ``offset`` applies.
+    ``query`` should select plain columns including ``key``; rows come back
+    as ``Row`` tuples.
+    """
+    query = query.order_by(key)
+
+    if page.cursor:
+        query = query.where(key > decode_cursor(page.cursor))
+    else:
+        query = query.offset(page.offset)
+
+    result = await session.execute(query.limit(page.limit + 1))
+    rows = result.all()
+
+    if len(rows) <= page.limit:
+        return rows, None
+
+    rows = rows[: page.limit]
+    return rows, encode_cursor(getattr(rows[-1], key.key))
@@ -0,0 +1,140 @@
+import time
+from collections import OrderedDict
+
+from guara.cache import RedisCache, RedisError
+from guara.settings import get_settings
+
+settings = get_settings()
+
+
+class MemoryBuckets:
+    """Token buckets held in this worker, least recently used evicted."""
+
+    def __init__(self, maxsize: int):
+        self.maxsize = maxsize
+        self._buckets: OrderedDict[str, tuple[float, float]] = OrderedDict()
+
+    async def take(self, key: str, rate: float, burst: int) -> float:
+        """Spend a token; return 0 if admitted, else seconds until one."""
+        now = time.monotonic()
+        tokens, stamp = self._buckets.get(key, (burst, now))
+        tokens = min(burst, tokens + (now - stamp) * rate)
+
+        wait = 0.0
+        if tokens >= 1:
+            tokens -= 1
+        else:
+            wait = (1 - tokens) / rate
+
+        self._buckets[key] = (tokens, now)
+        self._buckets.move_to_end(key)
+        while len(self._buckets) > self.maxsize:
+            self._buckets.popitem(last=False)
+        return wait
+
+
+class RedisBuckets:
+    """Buckets shared by every worker through a Redis-protocol server.
+
+    Plain commands can't refill a bucket atomically, so each key is a
+    counter that lives for ``burst / rate`` seconds and admits ``burst``
+    attempts: the same long-run rate as the in-process bucket. SET NX PX
+    creates it with its expiry in one step, so a crash between commands
+    can't leave a counter that never expires.
+    """
+
+    def __init__(self, client: RedisCache):
+        self.client = client
+
+    async def take(self, key: str, rate: float, burst: int) -> float:
+        window = int(burst / rate * 1000)
+        await self.client.execute('SET', key, 0, 'PX', window, 'NX')
+        if await self.client.execute('INCR', key) <= burst:
+            return 0.0
+        ttl = await self.client.execute('PTTL', key)
+        return (ttl if ttl > 0 else window) / 1000
+
+
+class LoginLimiter:
+    """Admission control for ``POST /auth/token``.
+
+    Each attempt spends a token from the client's bucket and then from
+    the account's, before the user is looked up or any Argon2 work runs.
+    A flood from one address is shed by the first; a spread-out attack on
+    one account by the second. If a shared backend is unreachable the
+    attempt is let through rather than locking everybody out.
+    """
+
+    def __init__(  # noqa: PLR0913, PLR0917
+        self,
+        buckets,
+        client_rate: float,
+        client_burst: int,
+        account_rate: float,
+        account_burst: int,
+    ):
+        self.buckets = buckets
+        self.client_rate = client_rate
+        self.client_burst = client_burst
+        self.account_rate = account_rate
+        self.account_burst = account_burst
+        self.admitted = 0
+        self.shed_client = 0
+        self.shed_account = 0
+        self.errors = 0
+
+    async def _take(self, key: str, rate: float, burst: int) -> float:
+        try:
+            return await self.buckets.take(key, rate, burst)
+        except (OSError, RedisError):
+            self.errors += 1
+            return 0.0
+
+    async def admit(self, client: str, account: str) -> float:
+        """Return 0 to admit the attempt, else the Retry-After seconds."""
+        if self.buckets is None:
+            return 0.0
+
+        wait = await self._take(
+            f'login:client:{client}', self.client_rate, self.client_burst
+        )
+        if wait:
+            self.shed_client += 1
+            return wait
+
+        wait = await self._take(
+            f'login:account:{account.strip().lower()}',
+            self.account_rate,
+            self.account_burst,
+        )
+        if wait:
+            self.shed_account += 1
+            return wait
+
+        self.admitted += 1
+        return 0.0
+
+    def stats(self) -> dict:
+        return {
+            'admitted': self.admitted,
+            'shed_client': self.shed_client,
+            'shed_account': self.shed_account,
+            'errors': self.errors,
+        }
+
+
+BUCKETS = {
+    'none': lambda settings: None,
+    'memory': lambda settings: MemoryBuckets(settings.LOGIN_LIMITER_SIZE),
+    'redis': lambda settings: RedisBuckets(
+        RedisCache(settings.LOGIN_LIMITER_URL, settings.REDIS_TIMEOUT)
+    ),
+}
+
+login_limiter = LoginLimiter(
+    BUCKETS[settings.LOGIN_LIMITER_BACKEND](settings),
+    settings.LOGIN_CLIENT_RATE,
+    settings.LOGIN_CLIENT_BURST,
+    settings.LOGIN_ACCOUNT_RATE,
+    settings.LOGIN_ACCOUNT_BURST,
+)
@@ -0,0 +1,64 @@
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from guara.cache import RedisError, shared_state
+from guara.settings import get_settings
+
+settings = get_settings()
+
+
+class RecentWrites:
+    """Remembers what was written lately, so reads of it skip replicas.
+
+    Writers mark a key (``user:<id>`` for a user and their todos, ``users``
+    for the user list) and reads of that key go to the primary until the
+    sticky window has passed, by which time replicas have caught up. Marks
+    are kept in ``guara.cache.shared_state``.
+    """
+
+    def __init__(self, backend, window: float):
+        self.backend = backend
+        self.window = window
+        self.replica_reads = 0
+        self.pinned_reads = 0
+
+    async def mark(self, *keys: str):
+        if not self.window:
+            return
+        for key in keys:
+            try:
+                await self.backend.set(f'primary:{key}', b'1', self.window)
+            except (OSError, RedisError):
+                pass
+
+    async def seen(self, key: str) -> bool:
+        try:
+            return await self.backend.get(f'primary:{key}') is not None
+        except (OSError, RedisError):
+            # can't tell, so assume the worst and read from the primary
+            return True
+
+    def stats(self) -> dict:
+        return {
+            'replica_reads': self.replica_reads,
+            'pinned_reads': self.pinned_reads,
+        }
+
+
+async def route_read(
+    primary: AsyncSession, replica: AsyncSession, key: str
+) -> AsyncSession:
+    if replica is primary:
+        return primary
+
+    if await recent_writes.seen(key):
+        recent_writes.pinned_reads += 1
+        return primary
+
+    recent_writes.replica_reads += 1
+    return replica
+
+
+recent_writes = RecentWrites(
+    shared_state,
+    settings.DATABASE_REPLICA_STICKY_SECONDS,
+)
@@ -0,0 +1,113 @@
+import asyncio
+from datetime import timedelta
+
+from sqlalchemy import ColumnElement, delete, func, select
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession
+
+from guara.models import Todo, TodoState
+from guara.settings import get_settings
+
+settings = get_settings()
+
+
+def trash_cutoff(dialect: str, retention: timedelta) -> ColumnElement:
+    """``retention`` ago on the database's clock, as ``updated_at`` keeps it.
+
+    ``updated_at`` is set by the database and has no zone, so the cutoff is
+    worked out there too: from LOCALTIMESTAMP on Postgres (the session's
+    time zone, as ``now()`` was stored) and from SQLite's UTC clock.
+    """
+    if dialect == 'sqlite':
+        return func.datetime('now', f'-{retention.total_seconds()} seconds')
+    return func.localtimestamp() - retention
+
+
+async def purge_trash_batch(
+    session: AsyncSession, cutoff: ColumnElement, batch_size: int
+) -> int:
+    """Delete up to ``batch_size`` todos trashed before ``cutoff``."""
+    keys = (
+        await session.execute(
+            select(Todo.user_id, Todo.id)
+            .where(Todo.state == TodoState.trash, Todo.updated_at < cutoff)
+            .limit(batch_size)
+            # concurrent purgers (one per worker) take different rows
+            .with_for_update(skip_locked=True)
+        )
+    ).all()
+    if not keys:
+        return 0
+
+    # ids alone pick the rows; user_id lets a partitioned todos prune and
+    # use its (user_id, id) key
+    result = await session.execute(
+        delete(Todo).where(
+            Todo.user_id.in_({user_id for user_id, _ in keys}),
+            Todo.id.in_([todo_id for _, todo_id in keys]),
+        ),
+        execution_options={'synchronize_session': False},
+    )
+    return result.rowcount
+
+
+class TrashPurger:
+    """Removes todos that have sat in the trash past the retention age.
+
+    ``updated_at`` is when a todo was last touched, so for trashed rows
+    it is when they were trashed. Rows go in batches of ``batch_size``,
+    each its own short transaction, with ``pause`` seconds in between so
+    the purge never holds many row locks or starves other writers.
+    """
+
+    def __init__(self, retention_days: float, batch_size: int, pause: float):
+        self.retention = timedelta(days=retention_days)
+        self.batch_size = batch_size
+        self.pause = pause
+        self.runs = 0
+        self.errors = 0
+        self.purged_last_run = 0
+        self.purged_total = 0
+
+    async def run(self, engine: AsyncEngine) -> int:
+        """Purge everything currently due; returns the rows removed."""
+        cutoff = trash_cutoff(engine.dialect.name, self.retention)
+        purged = 0
+        async with AsyncSession(engine) as session:
+            while True:
+                deleted = await purge_trash_batch(
+                    session, cutoff, self.batch_size
+                )
+                await session.commit()
+                purged += deleted
+                if deleted < self.batch_size:
+                    break
+                await asyncio.sleep(self.pause)
+
+        self.runs += 1
+        self.purged_last_run = purged
+        self.purged_total += purged
+        return purged
+
+    async def run_forever(self, engine: AsyncEngine, interval: float):
+        while True:
+            try:
+                await self.run(engine)
+            except Exception:
+                # counted on /metrics; the next run tries again
+                self.errors += 1
+            await asyncio.sleep(interval)
+
+    def stats(self) -> dict:
+        return {
+            'runs': self.runs,
+            'errors': self.errors,
+            'purged_last_run': self.purged_last_run,
+            'purged_total': self.purged_total,
+        }
+
+
+trash_purger = TrashPurger(
+    settings.TRASH_RETENTION_DAYS,
+    settings.TRASH_PURGE_BATCH_SIZE,
+    settings.TRASH_PURGE_PAUSE,
+)
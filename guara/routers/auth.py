@@ -1,18 +1,22 @@
+import math
 from http import HTTPStatus
 from typing import Annotated
 
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Request
 from fastapi.security import OAuth2PasswordRequestForm
 from sqlalchemy import select
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from guara.database import get_session
 from guara.models import User
+from guara.ratelimit import login_limiter
 from guara.schemas import Token
 from guara.security import (
     create_access_token,
     get_current_user,
-    verify_password,
+    store_rehashed_password,
+    token_claims,
+    verify_and_update_password_async,
 )
 
 router = APIRouter(prefix='/auth', tags=['auth'])
@@ -23,25 +27,48 @@ CurrentUser = Annotated[User, Depends(get_current_user)]
 
 
 @router.post('/token', response_model=Token)
-async def login_for_access_token(form_data: OAuth2Form, session: Session):
+async def login_for_access_token(
+    form_data: OAuth2Form, session: Session, request: Request
+):
+    client = request.client.host if request.client else 'unknown'
+    wait = await login_limiter.admit(client, form_data.username)
+    if wait:
+        raise HTTPException(
+            status_code=HTTPStatus.TOO_MANY_REQUESTS,
+            detail='Too many login attempts',
+            headers={'Retry-After': str(math.ceil(wait))},
+        )
+
     user = await session.scalar(
         select(User).where(User.email == form_data.username)
     )
 
-    if not user or not verify_password(form_data.password, user.password):
+    valid, new_hash = False, None
+    if user:
+        valid, new_hash = await verify_and_update_password_async(
+            form_data.password, user.password
+        )
+
+    if not valid:
         raise HTTPException(
             status_code=HTTPStatus.UNAUTHORIZED,
             detail='Incorrect email or password',
             headers={'WWW-Authenticate': 'Bearer'},
         )
 
-    access_token = create_access_token(data={'sub': user.email})
+    if new_hash:
+        await store_rehashed_password(session, user, new_hash)
+
+    access_token = create_access_token(data=token_claims(user))
 
     return {'access_token': access_token, 'token_type': 'bearer'}
 
 
 @router.post('/refresh_token', response_model=Token)
 async def refresh_access_token(current_user: CurrentUser):
-    new_access_token = create_access_token(data={'sub': current_user.email})
+    # Always checked against the user's row, even with AUTH_STATELESS:
+    # revocations live in a cache that can forget them, and a refresh
+    # would otherwise extend a revoked token indefinitely.
+    new_access_token = create_access_token(data=token_claims(current_user))
 
     return {'access_token': new_access_token, 'token_type': 'bearer'}
@@ -1,26 +1,79 @@
+import csv
 from http import HTTPStatus
 from typing import Annotated
 
-from fastapi import APIRouter, Depends, HTTPException, Query
-from sqlalchemy import select
-from sqlalchemy.ext.asyncio import AsyncSession
+from fastapi import (
+    APIRouter,
+    Depends,
+    Header,
+    HTTPException,
+    Query,
+    UploadFile,
+)
+from fastapi.responses import StreamingResponse
+from sqlalchemy import (
+    Integer,
+    Select,
+    String,
+    cast,
+    column,
+    delete,
+    func,
+    insert,
+    select,
+    update,
+    values,
+)
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession
+from starlette.concurrency import run_in_threadpool
 
-from guara.database import get_session
+from guara.counters import todo_counts
+from guara.database import get_replica_session, get_session
+from guara.etags import etag_matches, not_modified, page_etag
+from guara.importer import insert_batch, parse_todos, read_batch
 from guara.models import Todo, User
+from guara.pagination import paginate
+from guara.replicas import recent_writes, route_read
 from guara.schemas import (
+    FileFormat,
+    FilterExport,
+    FilterSearch,
     FilterTodo,
     Message,
+    TodoBulkCreate,
+    TodoBulkDelete,
+    TodoBulkResults,
+    TodoBulkUpdate,
+    TodoImportResult,
     TodoList,
     TodoPublic,
     TodoSchema,
+    TodoStats,
     TodoUpdate,
 )
-from guara.security import get_current_user
+from guara.search import search_query
+from guara.security import TokenIdentity, get_current_identity
+from guara.serializers import ListSerializer
 
 router = APIRouter(prefix='/todos', tags=['todos'])
 
+TODOS = ListSerializer('todos', TodoPublic, Todo)
+
+EXPORT_BATCH_SIZE = 1000
+EXPORT_MEDIA_TYPES = {'ndjson': 'application/x-ndjson', 'csv': 'text/csv'}
+
 Session = Annotated[AsyncSession, Depends(get_session)]
-CurrentUser = Annotated[User, Depends(get_current_user)]
+CurrentUser = Annotated[TokenIdentity | User, Depends(get_current_identity)]
+ReplicaSession = Annotated[AsyncSession, Depends(get_replica_session)]
+
+
+async def get_read_session(
+    user: CurrentUser, primary: Session, replica: ReplicaSession
+):
+    return await route_read(primary, replica, f'user:{user.id}')
+
+
+ReadSession = Annotated[AsyncSession, Depends(get_read_session)]
 
 router = APIRouter(prefix='/todos', tags=['todos'])
 
@@ -39,18 +92,15 @@ async def create_todo(
     )
     session.add(db_todo)
     await session.commit()
-    await session.refresh(db_todo)
+    await recent_writes.mark(f'user:{user.id}')
 
     return db_todo
 
 
-@router.get('/', response_model=TodoList)
-async def list_todos(
-    session: Session,
-    user: CurrentUser,
-    todo_filter: Annotated[FilterTodo, Query()],
-):
-    query = select(Todo).where(Todo.user_id == user.id)
+def filter_todos(
+    user_id: int, todo_filter: FilterTodo | FilterExport
+) -> Select:
+    query = select(Todo).where(Todo.user_id == user_id)
 
     if todo_filter.title:
         query = query.filter(Todo.title.contains(todo_filter.title))
@@ -63,13 +113,237 @@ async def list_todos(
     if todo_filter.state:
         query = query.filter(Todo.state == todo_filter.state)
 
+    return query
+
+
+@router.get('/', response_model=TodoList)
+async def list_todos(
+    session: ReadSession,
+    user: CurrentUser,
+    todo_filter: Annotated[FilterTodo, Query()],
+    if_none_match: Annotated[str | None, Header()] = None,
+):
+    query = filter_todos(user.id, todo_filter)
+
+    if if_none_match:
+        versions, next_cursor = await paginate(
+            session,
+            query.with_only_columns(Todo.id, Todo.updated_at),
+            todo_filter,
+            Todo.id,
+        )
+        etag = page_etag(versions, next_cursor)
+        if etag_matches(if_none_match, etag):
+            return not_modified(etag)
+
+    query = query.with_only_columns(*TODOS.columns)
+    todos, next_cursor = await paginate(session, query, todo_filter, Todo.id)
+
+    response = TODOS.response(todos, next_cursor)
+    response.headers['ETag'] = page_etag(todos, next_cursor)
+    return response
+
+
+async def stream_export(engine: AsyncEngine, query: Select, export_format):
+    # The request's session is closed before the body is streamed, so the
+    # export holds its own. yield_per makes the driver use a server-side
+    # cursor and fetch EXPORT_BATCH_SIZE rows at a time.
+    async with AsyncSession(engine) as session:
+        result = await session.stream(
+            query.execution_options(yield_per=EXPORT_BATCH_SIZE)
+        )
+        if export_format == 'csv':
+            yield TODOS.dump_csv([], header=True)
+        async for rows in result.partitions():
+            if export_format == 'csv':
+                yield TODOS.dump_csv(rows)
+            else:
+                yield TODOS.dump_ndjson(rows)
+
+
+@router.get('/export', response_class=StreamingResponse)
+async def export_todos(
+    session: ReadSession,
+    user: CurrentUser,
+    export_filter: Annotated[FilterExport, Query()],
+):
+    query = filter_todos(user.id, export_filter)
+    query = query.with_only_columns(*TODOS.columns).order_by(Todo.id)
+    export_format = export_filter.format
+
+    return StreamingResponse(
+        stream_export(session.bind, query, export_format),
+        media_type=EXPORT_MEDIA_TYPES[export_format],
+        headers={
+            'Content-Disposition': (
+                f'attachment; filename="todos.{export_format}"'
+            )
+        },
+    )
+
+
+@router.post('/import', response_model=TodoImportResult)
+async def import_todos(
+    session: Session,
+    user: CurrentUser,
+    file: UploadFile,
+    file_format: Annotated[FileFormat, Query(alias='format')] = 'ndjson',
+):
+    result = TodoImportResult()
+    todos = parse_todos(file.file, file_format)
+
+    try:
+        while batch := await run_in_threadpool(read_batch, todos, result):
+            await insert_batch(session, user.id, batch)
+            result.accepted += len(batch)
+    except (UnicodeDecodeError, csv.Error):
+        await session.rollback()
+        raise HTTPException(
+            status_code=HTTPStatus.BAD_REQUEST,
+            detail='File could not be parsed',
+        )
+
+    await session.commit()
+    await recent_writes.mark(f'user:{user.id}')
+
+    return result
+
+
+@router.get('/stats', response_model=TodoStats)
+async def read_todo_stats(session: ReadSession, user: CurrentUser):
+    counts = await todo_counts(session, user.id)
+
+    return {'counts': counts, 'total': sum(counts.values())}
+
+
+@router.get('/search', response_model=TodoList)
+async def search_todos(
+    session: ReadSession,
+    user: CurrentUser,
+    search_filter: Annotated[FilterSearch, Query()],
+):
+    query = search_query(session.bind.dialect.name, user.id, search_filter.q)
     todos = await session.scalars(
-        query.offset(todo_filter.offset).limit(todo_filter.limit)
+        query.offset(search_filter.offset).limit(search_filter.limit)
     )
 
     return {'todos': todos.all()}
 
 
+@router.post(
+    '/bulk', status_code=HTTPStatus.CREATED, response_model=TodoBulkResults
+)
+async def create_todos_bulk(
+    payload: TodoBulkCreate,
+    user: CurrentUser,
+    session: Session,
+):
+    # One multi-row INSERT on every backend. Postgres may return its rows
+    # in any order, so SQLAlchemy is asked to sort them; on SQLite that
+    # would cost one INSERT per row, but ids are handed out in row order
+    # there, so sorting by id restores the payload's.
+    sqlite = session.bind.dialect.name == 'sqlite'
+    todos = await session.scalars(
+        insert(Todo).returning(Todo, sort_by_parameter_order=not sqlite),
+        [todo.model_dump() | {'user_id': user.id} for todo in payload.todos],
+    )
+    todos = sorted(todos, key=lambda todo: todo.id) if sqlite else todos.all()
+    await session.commit()
+    await recent_writes.mark(f'user:{user.id}')
+
+    return {
+        'results': [
+            {'id': todo.id, 'status_code': HTTPStatus.CREATED, 'todo': todo}
+            for todo in todos
+        ]
+    }
+
+
+@router.patch('/bulk', response_model=TodoBulkResults)
+async def update_todos_bulk(
+    payload: TodoBulkUpdate,
+    user: CurrentUser,
+    session: Session,
+):
+    changes = (
+        values(
+            column('id', Integer),
+            column('title', String),
+            column('description', String),
+            column('state', String),
+            name='changes',
+        )
+        .data([
+            (todo.id, todo.title, todo.description, todo.state)
+            for todo in payload.todos
+        ])
+        .cte('changes')
+    )
+
+    todos = await session.scalars(
+        update(Todo)
+        .where(Todo.id == changes.c.id, Todo.user_id == user.id)
+        .values(
+            title=func.coalesce(changes.c.title, Todo.title),
+            description=func.coalesce(changes.c.description, Todo.description),
+            state=func.coalesce(
+                cast(changes.c.state, Todo.state.type), Todo.state
+            ),
+        )
+        .returning(Todo)
+        .execution_options(synchronize_session=False, populate_existing=True)
+    )
+    updated = {todo.id: todo for todo in todos}
+    await session.commit()
+    await recent_writes.mark(f'user:{user.id}')
+
+    return {
+        'results': [
+            {
+                'id': todo.id,
+                'status_code': HTTPStatus.OK,
+                'todo': updated[todo.id],
+            }
+            if todo.id in updated
+            else {
+                'id': todo.id,
+                'status_code': HTTPStatus.NOT_FOUND,
+                'detail': 'Task not found.',
+            }
+            for todo in payload.todos
+        ]
+    }
+
+
+@router.delete('/bulk', response_model=TodoBulkResults)
+async def delete_todos_bulk(
+    payload: TodoBulkDelete,
+    user: CurrentUser,
+    session: Session,
+):
+    deleted = await session.scalars(
+        delete(Todo)
+        .where(Todo.user_id == user.id, Todo.id.in_(payload.ids))
+        .returning(Todo.id)
+    )
+    deleted = set(deleted)
+    await session.commit()
+    await recent_writes.mark(f'user:{user.id}')
+
+    return {
+        'results': [
+            {'id': todo_id, 'status_code': HTTPStatus.OK}
+            if todo_id in deleted
+            else {
+                'id': todo_id,
+                'status_code': HTTPStatus.NOT_FOUND,
+                'detail': 'Task not found.',
+            }
+            for todo_id in payload.ids
+        ]
+    }
+
+
 @router.patch('/{todo_id}', response_model=TodoPublic)
 async def update_todo(
     todo_id: int,
@@ -77,8 +351,15 @@ async def update_todo(
     user: CurrentUser,
     todo: TodoUpdate,
 ):
+    changes = todo.model_dump(exclude_unset=True)
+    query = select(Todo)
+    if changes:
+        query = update(Todo).values(**changes).returning(Todo)
+
+    query = query.where(Todo.user_id == user.id, Todo.id == todo_id)
+
     db_todo = await session.scalar(
-        select(Todo).where(Todo.user_id == user.id, Todo.id == todo_id)
+        query.execution_options(populate_existing=True)
     )
 
     if not db_todo:
@@ -87,12 +368,8 @@ async def update_todo(
             detail='Task not found.',
         )
 
-    for key, value in todo.model_dump(exclude_unset=True).items():
-        setattr(db_todo, key, value)
-
-    session.add(db_todo)
     await session.commit()
-    await session.refresh(db_todo)
+    await recent_writes.mark(f'user:{user.id}')
 
     return db_todo
 
@@ -103,17 +380,19 @@ async def delete_todo(
     session: Session,
     user: CurrentUser,
 ):
-    db_todo = await session.scalar(
-        select(Todo).where(Todo.user_id == user.id, Todo.id == todo_id)
+    deleted = await session.scalar(
+        delete(Todo)
+        .where(Todo.user_id == user.id, Todo.id == todo_id)
+        .returning(Todo.id)
     )
 
-    if not db_todo:
+    if not deleted:
         raise HTTPException(
             status_code=HTTPStatus.NOT_FOUND,
             detail='Task not found.',
         )
 
-    await session.delete(db_todo)
     await session.commit()
+    await recent_writes.mark(f'user:{user.id}')
 
     return {'message': 'Task has been deleted successfully.'}
@@ -1,65 +1,112 @@
+import secrets
 from http import HTTPStatus
 from typing import Annotated
 
-from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi import (
+    APIRouter,
+    BackgroundTasks,
+    Depends,
+    Header,
+    HTTPException,
+    Query,
+    Response,
+)
+from fastapi.responses import JSONResponse
 from sqlalchemy import select
+from sqlalchemy.dialects import postgresql, sqlite
 from sqlalchemy.exc import IntegrityError
-from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession
 
-from guara.database import get_session
+from guara.cache import user_cache
+from guara.counters import todo_counts
+from guara.database import get_replica_session, get_session
+from guara.deletion import delete_todo_batch, deletion_jobs
+from guara.etags import etag_matches, make_etag, not_modified
 from guara.models import User
-from guara.schemas import FilterPage, Message, UserList, UserPublic, UserSchema
+from guara.pagination import paginate
+from guara.replicas import recent_writes, route_read
+from guara.schemas import (
+    FilterPage,
+    Message,
+    UserDeletion,
+    UserList,
+    UserPublic,
+    UserSchema,
+)
 from guara.security import (
     get_current_user,
-    get_password_hash,
+    get_password_hash_async,
+    token_revocations,
 )
+from guara.serializers import ListSerializer
 
 router = APIRouter(prefix='/users', tags=['users'])
 Session = Annotated[AsyncSession, Depends(get_session)]
 CurrentUser = Annotated[User, Depends(get_current_user)]
+ReplicaSession = Annotated[AsyncSession, Depends(get_replica_session)]
+
+
+async def get_users_read_session(primary: Session, replica: ReplicaSession):
+    return await route_read(primary, replica, 'users')
+
+
+async def get_user_read_session(
+    user_id: int, primary: Session, replica: ReplicaSession
+):
+    return await route_read(primary, replica, f'user:{user_id}')
+
+
+USERS = ListSerializer('users', UserPublic, User)
+
+# INSERT ... ON CONFLICT DO NOTHING lives in the dialect-specific insert().
+INSERTS = {'postgresql': postgresql.insert, 'sqlite': sqlite.insert}
 
 
 @router.post('/', status_code=HTTPStatus.CREATED, response_model=UserPublic)
 async def create_user(user: UserSchema, session: Session):
+    hashed_password = await get_password_hash_async(user.password)
+
+    insert = INSERTS[session.bind.dialect.name]
     db_user = await session.scalar(
-        select(User).where(
-            (User.username == user.username) | (User.email == user.email)
+        insert(User)
+        .values(
+            username=user.username, password=hashed_password, email=user.email
         )
+        .on_conflict_do_nothing()
+        .returning(User)
     )
-    if db_user:
-        if db_user.username == user.username:
+
+    if not db_user:
+        conflict = await session.scalar(
+            select(User.username).where(
+                (User.username == user.username) | (User.email == user.email)
+            )
+        )
+        if conflict == user.username:
             raise HTTPException(
                 status_code=HTTPStatus.CONFLICT,
                 detail='Username already exists',
             )
-        elif db_user.email == user.email:
-            raise HTTPException(
-                status_code=HTTPStatus.CONFLICT, detail='Email already exists'
-            )
-
-    hashed_password = get_password_hash(user.password)
+        raise HTTPException(
+            status_code=HTTPStatus.CONFLICT, detail='Email already exists'
+        )
 
-    db_user = User(
-        username=user.username, password=hashed_password, email=user.email
-    )
-    session.add(db_user)
     await session.commit()
-    await session.refresh(db_user)
+    await recent_writes.mark('users')
 
     return db_user
 
 
 @router.get('/', status_code=HTTPStatus.OK, response_model=UserList)
 async def read_users(
-    session: Session, filter_users: Annotated[FilterPage, Query()]
+    session: Annotated[AsyncSession, Depends(get_users_read_session)],
+    filter_users: Annotated[FilterPage, Query()],
 ):
-    query = await session.scalars(
-        select(User).offset(filter_users.offset).limit(filter_users.limit)
+    users, next_cursor = await paginate(
+        session, select(*USERS.columns), filter_users, User.id
     )
 
-    users = query.all()
-
-    return {'users': users}
+    return USERS.response(users, next_cursor)
 
 
 @router.put('/{user_id}', status_code=HTTPStatus.OK, response_model=UserPublic)
@@ -75,14 +122,14 @@ async def update_user(
             detail='Not enough permissions',
         )
 
+    old_email = current_user.email
+
     try:
         current_user.username = user.username
         current_user.email = user.email
-        current_user.password = get_password_hash(user.password)
+        current_user.password = await get_password_hash_async(user.password)
+        current_user.token_version += 1
         await session.commit()
-        await session.refresh(current_user)
-
-        return current_user
 
     except IntegrityError:
         raise HTTPException(
@@ -90,12 +137,30 @@ async def update_user(
             detail='Username or email already exists',
         )
 
+    await user_cache.invalidate(user_id, old_email)
+    await recent_writes.mark(f'user:{user_id}', 'users')
+    await token_revocations.revoke(user_id, current_user.token_version)
+
+    return current_user
+
+
+async def finish_deletion(engine: AsyncEngine, progress: dict, email: str):
+    await deletion_jobs.run(engine, progress)
+    user_id = progress['user_id']
+    await user_cache.invalidate(user_id, email)
+    await recent_writes.mark(f'user:{user_id}', 'users')
+
 
-@router.delete('/{user_id}', response_model=Message)
+@router.delete(
+    '/{user_id}',
+    response_model=Message,
+    responses={HTTPStatus.ACCEPTED: {'model': UserDeletion}},
+)
 async def delete_user(
     user_id: int,
     session: Session,
     current_user: CurrentUser,
+    background_tasks: BackgroundTasks,
 ):
     if current_user.id != user_id:
         raise HTTPException(
@@ -103,18 +168,77 @@ async def delete_user(
             detail='Not enough permissions',
         )
 
+    email = current_user.email
+    await token_revocations.revoke(user_id, current_user.token_version + 1)
+
+    # Accounts with more todos than one batch are deleted in the
+    # background; the caller polls the job instead of holding a request.
+    total = sum((await todo_counts(session, user_id)).values())
+    if total > deletion_jobs.batch_size:
+        progress = await deletion_jobs.running(user_id)
+        if not progress:
+            progress = await deletion_jobs.start(user_id, total)
+            background_tasks.add_task(
+                finish_deletion, session.bind, progress, email
+            )
+        return JSONResponse(
+            progress,
+            status_code=HTTPStatus.ACCEPTED,
+            headers={
+                'Location': f'/users/{user_id}/deletion/{progress["job_id"]}'
+            },
+        )
+
+    await delete_todo_batch(session, user_id, deletion_jobs.batch_size)
     await session.delete(current_user)
     await session.commit()
+    await user_cache.invalidate(user_id, email)
+    await recent_writes.mark(f'user:{user_id}', 'users')
 
     return {'message': 'User deleted successfully'}
 
 
-@router.get('/{user_id}', status_code=HTTPStatus.OK, response_model=UserPublic)
-async def get_user(user_id: int, session: Session):
-    db_user = await session.scalar(select(User).where(User.id == user_id))
-    if not db_user:
+@router.get(
+    '/{user_id}/deletion/{job_id}',
+    status_code=HTTPStatus.OK,
+    response_model=UserDeletion,
+)
+async def read_user_deletion(user_id: int, job_id: str):
+    # The caller's token stops working once the account is gone (at once
+    # with AUTH_STATELESS), so the job id handed out by DELETE is what
+    # authorizes polling.
+    progress = await deletion_jobs.progress(user_id)
+    if not progress or not secrets.compare_digest(
+        progress.get('job_id', ''), job_id
+    ):
         raise HTTPException(
-            status_code=HTTPStatus.NOT_FOUND, detail='User not found'
+            status_code=HTTPStatus.NOT_FOUND, detail='No deletion found'
         )
+    return progress
+
+
+@router.get('/{user_id}', status_code=HTTPStatus.OK, response_model=UserPublic)
+async def get_user(
+    user_id: int,
+    session: Annotated[AsyncSession, Depends(get_user_read_session)],
+    response: Response,
+    if_none_match: Annotated[str | None, Header()] = None,
+):
+    db_user = await user_cache.get_by_id(user_id)
+    if not db_user:
+        db_user = await session.scalar(select(User).where(User.id == user_id))
+        if not db_user:
+            raise HTTPException(
+                status_code=HTTPStatus.NOT_FOUND, detail='User not found'
+            )
+        await user_cache.set(db_user)
+        db_user = {field: getattr(db_user, field) for field in USERS.fields}
+
+    # The public fields are all there is to the body, so hashing them gives
+    # an exact tag without encoding anything.
+    etag = make_etag(db_user[field] for field in USERS.fields)
+    if etag_matches(if_none_match, etag):
+        return not_modified(etag)
 
+    response.headers['ETag'] = etag
     return db_user
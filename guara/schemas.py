@@ -1,9 +1,12 @@
 from datetime import datetime
+from typing import Literal
 
-from pydantic import BaseModel, ConfigDict, EmailStr
+from pydantic import BaseModel, ConfigDict, EmailStr, Field, model_validator
 
 from guara.models import TodoState
 
+FileFormat = Literal['ndjson', 'csv']
+
 
 class Message(BaseModel):
     message: str
@@ -26,6 +29,15 @@ class UserPublic(BaseModel):
 
 class UserList(BaseModel):
     users: list[UserPublic]
+    next_cursor: str | None = None
+
+
+class UserDeletion(BaseModel):
+    job_id: str
+    user_id: int
+    status: Literal['running', 'done', 'failed']
+    total: int
+    deleted: int
 
 
 class Token(BaseModel):
@@ -34,8 +46,9 @@ class Token(BaseModel):
 
 
 class FilterPage(BaseModel):
-    offset: int = 0
-    limit: int = 100
+    offset: int = Field(default=0, ge=0)
+    limit: int = Field(default=100, ge=1, le=1000)
+    cursor: str | None = None
 
 
 class TodoSchema(BaseModel):
@@ -52,6 +65,12 @@ class TodoPublic(TodoSchema):
 
 class TodoList(BaseModel):
     todos: list[TodoPublic]
+    next_cursor: str | None = None
+
+
+class TodoStats(BaseModel):
+    counts: dict[TodoState, int]
+    total: int
 
 
 class FilterTodo(FilterPage):
@@ -60,7 +79,68 @@ class FilterTodo(FilterPage):
     state: TodoState | None = None
 
 
+class FilterSearch(BaseModel):
+    # a blank query has no terms to match, so it's rejected like an empty one
+    model_config = ConfigDict(str_strip_whitespace=True)
+
+    q: str = Field(min_length=1)
+    offset: int = Field(default=0, ge=0)
+    limit: int = Field(default=100, ge=1, le=1000)
+
+
+class FilterExport(BaseModel):
+    title: str | None = None
+    description: str | None = None
+    state: TodoState | None = None
+    format: FileFormat = 'ndjson'
+
+
 class TodoUpdate(BaseModel):
     title: str | None = None
     description: str | None = None
     state: TodoState | None = None
+
+
+class TodoBulkCreate(BaseModel):
+    todos: list[TodoSchema] = Field(min_length=1, max_length=1000)
+
+
+class TodoBulkUpdateItem(TodoUpdate):
+    id: int
+
+
+class TodoBulkUpdate(BaseModel):
+    todos: list[TodoBulkUpdateItem] = Field(min_length=1, max_length=1000)
+
+    @model_validator(mode='after')
+    def check_unique_ids(self):
+        ids = [todo.id for todo in self.todos]
+        if len(ids) != len(set(ids)):
+            raise ValueError('Duplicate todo ids')
+        return self
+
+
+class TodoBulkDelete(BaseModel):
+    ids: list[int] = Field(min_length=1, max_length=1000)
+
+
+class TodoBulkResult(BaseModel):
+    id: int
+    status_code: int
+    todo: TodoPublic | None = None
+    detail: str | None = None
+
+
+class TodoBulkResults(BaseModel):
+    results: list[TodoBulkResult]
+
+
+class TodoImportError(BaseModel):
+    line: int
+    detail: str
+
+
+class TodoImportResult(BaseModel):
+    accepted: int = 0
+    rejected: int = 0
+    errors: list[TodoImportError] = []
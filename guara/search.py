@@ -0,0 +1,104 @@
+from sqlalchemy import (
+    DDL,
+    Select,
+    column,
+    event,
+    func,
+    literal_column,
+    select,
+    table,
+)
+from sqlalchemy.dialects.postgresql import TSVECTOR
+
+from guara.models import Todo
+
+# Postgres keeps a weighted tsvector next to each row (title ranks above
+# description) and indexes it with GIN. SQLite mirrors title/description
+# into an external-content FTS5 table kept in sync by triggers.
+POSTGRES_DDL = (
+    """
+    ALTER TABLE todos ADD COLUMN search_vector tsvector
+    GENERATED ALWAYS AS (
+        setweight(to_tsvector('simple', title), 'A')
+        || setweight(to_tsvector('simple', description), 'B')
+    ) STORED
+    """,
+    'CREATE INDEX ix_todos_search_vector ON todos USING gin (search_vector)',
+)
+
+SQLITE_DDL = (
+    """
+    CREATE VIRTUAL TABLE IF NOT EXISTS todos_fts USING fts5(
+        title, description, content='todos', content_rowid='id'
+    )
+    """,
+    """
+    CREATE TRIGGER todos_fts_insert AFTER INSERT ON todos BEGIN
+        INSERT INTO todos_fts (rowid, title, description)
+        VALUES (new.id, new.title, new.description);
+    END
+    """,
+    """
+    CREATE TRIGGER todos_fts_delete AFTER DELETE ON todos BEGIN
+        INSERT INTO todos_fts (todos_fts, rowid, title, description)
+        VALUES ('delete', old.id, old.title, old.description);
+    END
+    """,
+    """
+    CREATE TRIGGER todos_fts_update AFTER UPDATE OF title, description
+    ON todos BEGIN
+        INSERT INTO todos_fts (todos_fts, rowid, title, description)
+        VALUES ('delete', old.id, old.title, old.description);
+        INSERT INTO todos_fts (rowid, title, description)
+        VALUES (new.id, new.title, new.description);
+    END
+    """,
+)
+
+todos_fts = table('todos_fts', column('rowid'))
+
+for statement in POSTGRES_DDL:
+    event.listen(
+        Todo.__table__,
+        'after_create',
+        DDL(statement).execute_if(dialect='postgresql'),
+    )
+
+for statement in SQLITE_DDL:
+    event.listen(
+        Todo.__table__,
+        'after_create',
+        DDL(statement).execute_if(dialect='sqlite'),
+    )
+
+event.listen(
+    Todo.__table__,
+    'after_drop',
+    DDL('DROP TABLE IF EXISTS todos_fts').execute_if(dialect='sqlite'),
+)
+
+
+def _fts5_query(q: str) -> str:
+    # Quote every term so user input is never parsed as FTS5 syntax.
+    return ' '.join(
+        '"{}"'.format(term.replace('"', '""')) for term in q.split()
+    )
+
+
+def search_query(dialect: str, user_id: int, q: str) -> Select:
+    """Build a relevance-ordered search over one user's todos."""
+    query = select(Todo).where(Todo.user_id == user_id)
+
+    if dialect == 'postgresql':
+        vector = literal_column('todos.search_vector', TSVECTOR)
+        tsquery = func.plainto_tsquery('simple', q)
+        return query.where(vector.bool_op('@@')(tsquery)).order_by(
+            func.ts_rank(vector, tsquery).desc(), Todo.id
+        )
+
+    fts = literal_column('todos_fts')
+    return (
+        query.join(todos_fts, todos_fts.c.rowid == Todo.id)
+        .where(fts.op('MATCH')(_fts5_query(q)))
+        .order_by(func.bm25(fts, 10.0, 1.0), Todo.id)
+    )
@@ -1,3 +1,11 @@
+import asyncio
+import functools
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
 from datetime import datetime, timedelta
 from http import HTTPStatus
 from zoneinfo import ZoneInfo
@@ -6,52 +14,269 @@ from fastapi import Depends, HTTPException
 from fastapi.security import OAuth2PasswordBearer
 from jwt import DecodeError, ExpiredSignatureError, decode, encode
 from pwdlib import PasswordHash
-from sqlalchemy import select
+from pwdlib.hashers.argon2 import Argon2Hasher
+from sqlalchemy import select, update
 from sqlalchemy.ext.asyncio import AsyncSession
 
+from guara.cache import RedisError, attach_user, shared_state, user_cache
 from guara.database import get_session
+from guara.metrics import PASSWORD_HASH_DURATION, timed
 from guara.models import User
-from guara.settings import Settings
+from guara.settings import get_settings
+
+settings = get_settings()
+
+
+@functools.cache
+def get_password_context() -> PasswordHash:
+    """The Argon2 context, built on first use from the configured costs."""
+    return PasswordHash((
+        Argon2Hasher(
+            time_cost=settings.PASSWORD_HASH_TIME_COST,
+            memory_cost=settings.PASSWORD_HASH_MEMORY_COST,
+            parallelism=settings.PASSWORD_HASH_PARALLELISM,
+        ),
+    ))
+
 
-settings = Settings()
-pwd_context = PasswordHash.recommended()  # by default, pwdlib uses 'argon2'
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl='auth/token')
 
 
-async def get_current_user(
-    session: AsyncSession = Depends(get_session),
-    token: str = Depends(oauth2_scheme),
-):
-    credentials_exception = HTTPException(
+class PasswordHasher:
+    """Runs Argon2 work on a bounded thread pool.
+
+    Argon2 releases the GIL, so hashing on worker threads keeps the event
+    loop free while using spare cores. At most ``max_workers`` hashes run
+    at once; anything beyond that waits in the executor queue.
+    """
+
+    def __init__(self, max_workers: int):
+        self.max_workers = max_workers
+        self._executor = ThreadPoolExecutor(
+            max_workers=max_workers, thread_name_prefix='argon2'
+        )
+        self._lock = threading.Lock()
+        self._queued = 0
+        self._running = 0
+        self._max_queued = 0
+
+    def _call(self, func, *args):
+        with self._lock:
+            self._queued -= 1
+            self._running += 1
+        try:
+            return func(*args)
+        finally:
+            with self._lock:
+                self._running -= 1
+
+    def _forget(self, future):
+        # a caller cancelled while still queued takes its item out of the
+        # executor, so _call never runs to count it off
+        if future.cancelled():
+            with self._lock:
+                self._queued -= 1
+
+    async def run(self, func, *args):
+        with self._lock:
+            self._queued += 1
+            self._max_queued = max(self._max_queued, self._queued)
+
+        future = self._executor.submit(self._call, func, *args)
+        future.add_done_callback(self._forget)
+        return await asyncio.wrap_future(future)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                'max_workers': self.max_workers,
+                'running': self._running,
+                'queued': self._queued,
+                'max_queued': self._max_queued,
+            }
+
+
+password_hasher = PasswordHasher(settings.PASSWORD_HASH_WORKERS)
+
+
+@dataclass(frozen=True, slots=True)
+class TokenIdentity:
+    """The bearer of a stateless token, as its signed claims describe them."""
+
+    id: int
+    email: str
+    token_version: int
+
+
+class TokenRevocations:
+    """Lowest token version still accepted for users who revoked theirs.
+
+    Bumping ``users.token_version`` stops new tokens from carrying the old
+    version; recording it here is what stops stateless requests from
+    trusting tokens already handed out. An entry only has to outlive the
+    tokens it revokes, so it expires with them. Entries are kept in
+    ``guara.cache.shared_state``.
+    """
+
+    def __init__(self, backend, ttl: float):
+        self.backend = backend
+        self.ttl = ttl
+        self.rejected = 0
+        self.errors = 0
+
+    async def revoke(self, user_id: int, version: int):
+        try:
+            await self.backend.set(
+                f'token_version:{user_id}', str(version).encode(), self.ttl
+            )
+        except (OSError, RedisError):
+            self.errors += 1
+
+    async def minimum(self, user_id: int) -> int:
+        value = await self.backend.get(f'token_version:{user_id}')
+        return 0 if value is None else int(value)
+
+    def stats(self) -> dict:
+        return {'rejected': self.rejected, 'errors': self.errors}
+
+
+token_revocations = TokenRevocations(
+    shared_state,
+    settings.ACCESS_TOKEN_EXPIRE_MINUTES * 60,
+)
+
+
+class TokenCache:
+    """Claims of recently verified tokens, keyed by a digest of the token.
+
+    A client reusing its token for many calls pays for the signature check
+    and JSON parsing once. The cache is per worker on purpose: a network
+    round trip costs more than the decode it would save. Keys are digests,
+    so bearer tokens are never held in memory, and an entry is dropped
+    once the token's ``exp`` has passed, so expiry is enforced as before.
+    """
+
+    def __init__(self, maxsize: int):
+        self.maxsize = maxsize
+        self._entries: OrderedDict[bytes, tuple[float, dict]] = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def _key(token: str) -> bytes:
+        return hashlib.blake2b(token.encode(), digest_size=16).digest()
+
+    def get(self, token: str) -> dict | None:
+        key = self._key(token)
+        entry = self._entries.get(key)
+        if entry is None or entry[0] <= time.time():
+            self._entries.pop(key, None)
+            self.misses += 1
+            return None
+
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return entry[1]
+
+    def set(self, token: str, payload: dict):
+        if not self.maxsize or 'exp' not in payload:
+            return
+        self._entries[self._key(token)] = (payload['exp'], payload)
+        while len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
+
+    def stats(self) -> dict:
+        return {
+            'size': len(self._entries),
+            'hits': self.hits,
+            'misses': self.misses,
+        }
+
+
+token_cache = TokenCache(settings.TOKEN_CACHE_SIZE)
+
+
+def _credentials_exception():
+    return HTTPException(
         status_code=HTTPStatus.UNAUTHORIZED,
         detail='Could not validate credentials',
         headers={'WWW-Authenticate': 'Bearer'},
     )
-    try:
-        payload = decode(
-            token, settings.SECRET_KEY, algorithms=[settings.ALGORITHM]
-        )
-        subject_email: str = payload.get('sub')
 
-        if not subject_email:
-            raise credentials_exception
 
-    except DecodeError:
-        raise credentials_exception
+def decode_token(token: str) -> dict:
+    payload = token_cache.get(token)
+    if payload is None:
+        try:
+            payload = decode(
+                token, settings.SECRET_KEY, algorithms=[settings.ALGORITHM]
+            )
+        except (DecodeError, ExpiredSignatureError):
+            raise _credentials_exception()
+        token_cache.set(token, payload)
 
-    except ExpiredSignatureError:
-        raise credentials_exception
+    if not payload.get('sub'):
+        raise _credentials_exception()
+    return payload
 
-    user = await session.scalar(
-        select(User).where(User.email == subject_email)
-    )
 
-    if not user:
-        raise credentials_exception
+async def _load_user(session: AsyncSession, payload: dict) -> User:
+    subject_email = payload['sub']
+    cached = await user_cache.get_by_email(subject_email)
+    if cached:
+        user = await attach_user(session, cached)
+    else:
+        user = await session.scalar(
+            select(User).where(User.email == subject_email)
+        )
+        if not user:
+            raise _credentials_exception()
+        await user_cache.set(user)
 
+    if settings.AUTH_STATELESS and user.token_version > payload.get('ver', 0):
+        token_revocations.rejected += 1
+        raise _credentials_exception()
     return user
 
 
+async def get_current_user(
+    session: AsyncSession = Depends(get_session),
+    token: str = Depends(oauth2_scheme),
+):
+    return await _load_user(session, decode_token(token))
+
+
+async def get_current_identity(
+    session: AsyncSession = Depends(get_session),
+    token: str = Depends(oauth2_scheme),
+) -> TokenIdentity | User:
+    """Who is calling, without loading their row when that can be avoided.
+
+    With ``AUTH_STATELESS`` a token carrying ``uid`` and ``ver`` is taken
+    at its word unless its version has been revoked. Tokens from before
+    the claims existed, and revocation lookups that fail, fall back to
+    loading the user, which checks the version against the row.
+    """
+    payload = decode_token(token)
+    if not settings.AUTH_STATELESS or 'uid' not in payload:
+        return await _load_user(session, payload)
+
+    try:
+        minimum = await token_revocations.minimum(payload['uid'])
+    except (OSError, RedisError):
+        token_revocations.errors += 1
+        return await _load_user(session, payload)
+
+    if payload.get('ver', 0) < minimum:
+        token_revocations.rejected += 1
+        raise _credentials_exception()
+    return TokenIdentity(payload['uid'], payload['sub'], payload.get('ver', 0))
+
+
+def token_claims(user: TokenIdentity | User) -> dict:
+    return {'sub': user.email, 'uid': user.id, 'ver': user.token_version}
+
+
 def create_access_token(data: dict):
     to_encode = data.copy()
     expire = datetime.now(tz=ZoneInfo('UTC')) + timedelta(
@@ -65,8 +290,103 @@ def create_access_token(data: dict):
 
 
 def get_password_hash(password: str):
-    return pwd_context.hash(password)
+    with timed(PASSWORD_HASH_DURATION, 'hash'):
+        return get_password_context().hash(password)
 
 
 def verify_password(plain_password: str, hashed_password: str):
-    return pwd_context.verify(plain_password, hashed_password)
+    with timed(PASSWORD_HASH_DURATION, 'verify'):
+        return get_password_context().verify(plain_password, hashed_password)
+
+
+def verify_and_update_password(
+    plain_password: str, hashed_password: str
+) -> tuple[bool, str | None]:
+    """Verify a password and, if its hash has stale costs, rehash it."""
+    if not verify_password(plain_password, hashed_password):
+        return False, None
+    hasher = get_password_context().current_hasher
+    if not hasher.check_needs_rehash(hashed_password):
+        return True, None
+    return True, get_password_hash(plain_password)
+
+
+async def get_password_hash_async(password: str):
+    return await password_hasher.run(get_password_hash, password)
+
+
+async def verify_password_async(plain_password: str, hashed_password: str):
+    return await password_hasher.run(
+        verify_password, plain_password, hashed_password
+    )
+
+
+async def verify_and_update_password_async(
+    plain_password: str, hashed_password: str
+):
+    return await password_hasher.run(
+        verify_and_update_password, plain_password, hashed_password
+    )
+
+
+async def store_rehashed_password(
+    session: AsyncSession, user: User, new_hash: str
+):
+    """Swap in a hash with current costs, unless the password has changed.
+
+    ``updated_at`` is kept as is: the account didn't change, so cached
+    users and ETags built from it stay valid.
+    """
+    await session.execute(
+        update(User)
+        .where(User.id == user.id, User.password == user.password)
+        .values(password=new_hash, updated_at=User.updated_at)
+    )
+    await session.commit()
+
+
+def measure_hash(
+    time_cost: int, memory_cost: int, parallelism: int, rounds: int = 3
+) -> float:
+    hasher = Argon2Hasher(
+        time_cost=time_cost, memory_cost=memory_cost, parallelism=parallelism
+    )
+    best = float('inf')
+    for _ in range(rounds):
+        start = time.perf_counter()
+        hasher.hash('calibration password')
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def calibrate_hashing(
+    target_seconds: float, max_memory_kib: int, workers: int, parallelism: int
+) -> dict:
+    """Pick Argon2 costs for this host.
+
+    Each of the ``workers`` hashing threads gets an equal share of the
+    memory budget; memory is what makes
+    guessing expensive on GPUs, so it is spent first. Passes are then
+    added while a hash still fits the target time. If a single pass is
+    already too slow, memory is halved until it fits.
+    """
+    memory_cost = max(8 * parallelism, max_memory_kib // workers)
+
+    seconds = measure_hash(1, memory_cost, parallelism)
+    while seconds > target_seconds and memory_cost > 8 * parallelism:
+        memory_cost //= 2
+        seconds = measure_hash(1, memory_cost, parallelism)
+
+    time_cost = 1
+    while True:
+        slower = measure_hash(time_cost + 1, memory_cost, parallelism)
+        if slower > target_seconds:
+            break
+        time_cost, seconds = time_cost + 1, slower
+
+    return {
+        'PASSWORD_HASH_TIME_COST': time_cost,
+        'PASSWORD_HASH_MEMORY_COST': memory_cost,
+        'PASSWORD_HASH_PARALLELISM': parallelism,
+        'seconds': seconds,
+    }
@@ -1,4 +1,9 @@
-from pydantic_settings import BaseSettings, SettingsConfigDict
+import functools
+import os
+from typing import Annotated, Literal
+
+from pydantic import Field, field_validator
+from pydantic_settings import BaseSettings, NoDecode, SettingsConfigDict
 
 
 class Settings(BaseSettings):
@@ -10,3 +15,64 @@ class Settings(BaseSettings):
     SECRET_KEY: str
     ALGORITHM: str
     ACCESS_TOKEN_EXPIRE_MINUTES: int
+
+    DATABASE_POOL_SIZE: int = 5
+    DATABASE_MAX_OVERFLOW: int = 10
+    DATABASE_POOL_TIMEOUT: float = 30
+    DATABASE_POOL_RECYCLE: int = -1
+    DATABASE_POOL_PRE_PING: bool = False
+    DATABASE_NULL_POOL: bool = False
+    DATABASE_DISABLE_PREPARED_STATEMENTS: bool = False
+    DATABASE_REPLICA_URLS: Annotated[list[str], NoDecode] = []
+    DATABASE_REPLICA_STICKY_SECONDS: float = Field(default=5, ge=0)
+
+    USER_DELETE_BATCH_SIZE: int = Field(default=5_000, gt=0)
+
+    TRASH_RETENTION_DAYS: float = Field(default=30, gt=0)
+    TRASH_PURGE_BATCH_SIZE: int = Field(default=1_000, gt=0)
+    TRASH_PURGE_PAUSE: float = Field(default=0.1, ge=0)
+    # seconds between purges run by the app itself; 0 leaves it to the CLI
+    TRASH_PURGE_INTERVAL: float = Field(default=0, ge=0)
+
+    AUTH_STATELESS: bool = False
+    TOKEN_CACHE_SIZE: int = Field(default=10_000, ge=0)
+
+    PASSWORD_HASH_WORKERS: int = Field(
+        default_factory=lambda: os.cpu_count() or 1, gt=0
+    )
+    # Argon2 costs; ``python -m guara.cli calibrate-hashing`` suggests them
+    # for the host. Stored hashes with other costs are redone at login.
+    PASSWORD_HASH_TIME_COST: int = Field(default=3, ge=1)
+    PASSWORD_HASH_MEMORY_COST: int = Field(default=65_536, ge=64)
+    PASSWORD_HASH_PARALLELISM: int = Field(default=4, ge=1)
+
+    USER_CACHE_BACKEND: Literal['none', 'memory', 'redis'] = 'memory'
+    USER_CACHE_URL: str = 'redis://localhost:6379/0'
+    USER_CACHE_TTL: float = Field(default=60, gt=0)
+    USER_CACHE_SIZE: int = Field(default=10_000, gt=0)
+    # seconds a Redis command may take before it counts as a backend error
+    REDIS_TIMEOUT: float = Field(default=1, gt=0)
+
+    LOGIN_LIMITER_BACKEND: Literal['none', 'memory', 'redis'] = 'memory'
+    LOGIN_LIMITER_URL: str = 'redis://localhost:6379/0'
+    LOGIN_LIMITER_SIZE: int = Field(default=100_000, gt=0)
+    LOGIN_CLIENT_RATE: float = Field(default=1, gt=0)
+    LOGIN_CLIENT_BURST: int = Field(default=20, gt=0)
+    LOGIN_ACCOUNT_RATE: float = Field(default=0.2, gt=0)
+    LOGIN_ACCOUNT_BURST: int = Field(default=10, gt=0)
+
+    @field_validator('DATABASE_REPLICA_URLS', mode='before')
+    @classmethod
+    def split_replica_urls(cls, value):
+        if isinstance(value, str):
+            return [url.strip() for url in value.split(',') if url.strip()]
+        return value
+
+
+@functools.cache
+def get_settings() -> Settings:
+    """The process-wide settings, read from the environment and ``.env`` once.
+
+    Tests and tools that need other values build their own ``Settings``.
+    """
+    return Settings()
@@ -0,0 +1,99 @@
+"""Where a worker's cold start goes: module imports and lazy initializers.
+
+A fresh interpreter runs with ``-X importtime`` and imports the app, then
+builds each lazily created resource and times it. Both happen in a child
+process so that modules this process has already imported can't hide
+their cost.
+"""
+
+import json
+import subprocess
+import sys
+from dataclasses import dataclass
+
+SCRIPT = """
+import json, time
+
+began = time.perf_counter()
+import guara.app
+imported = time.perf_counter() - began
+
+from guara.database import get_engine, get_replicas
+from guara.security import get_password_context
+from guara.settings import Settings
+
+steps = {
+    'settings': Settings,
+    'engine': get_engine,
+    'replicas': get_replicas,
+    'password_context': get_password_context,
+}
+timings = {'import guara.app': imported}
+for name, step in steps.items():
+    began = time.perf_counter()
+    step()
+    timings[name] = time.perf_counter() - began
+print(json.dumps(timings))
+"""
+
+
+@dataclass(frozen=True, slots=True)
+class ModuleImport:
+    name: str
+    self_us: int
+    cumulative_us: int
+
+
+def parse_importtime(output: str) -> list[ModuleImport]:
+    """Read the lines ``-X importtime`` writes to stderr, in import order."""
+    modules = []
+    for line in output.splitlines():
+        if not line.startswith('import time:'):
+            continue
+        self_us, cumulative_us, name = line[len('import time:') :].split('|')
+        if not self_us.strip().isdigit():
+            continue  # the column header
+        modules.append(
+            ModuleImport(name.strip(), int(self_us), int(cumulative_us))
+        )
+    return modules
+
+
+def profile_startup() -> tuple[list[ModuleImport], dict[str, float]]:
+    """Return every module's import time and each initializer's seconds."""
+    completed = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', SCRIPT],
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    timings = json.loads(completed.stdout.splitlines()[-1])
+    return parse_importtime(completed.stderr), timings
+
+
+def report(
+    modules: list[ModuleImport], timings: dict[str, float], top: int
+) -> list[str]:
+    """Format the timings, the app's own modules and the ``top`` others."""
+    lines = [
+        f'{name:<32}{seconds * 1000:>10.1f} ms'
+        for name, seconds in timings.items()
+    ]
+    own = [m for m in modules if m.name.split('.')[0] == 'guara']
+    others = sorted(
+        (m for m in modules if m.name.split('.')[0] != 'guara'),
+        key=lambda m: m.self_us,
+        reverse=True,
+    )[:top]
+
+    for title, group in [('guara', own), (f'top {top} other', others)]:
+        lines += [
+            '',
+            f'{title + " imports":<32}{"self":>10}{"cumulative":>14}',
+        ]
+        lines += [
+            f'{m.name:<32}{m.self_us / 1000:>7.1f} ms'
+            f'{m.cumulative_us / 1000:>11.1f} ms'
+            for m in group
+        ]
+    return lines
@@ -8,10 +8,10 @@ from sqlalchemy import pool
 from alembic import context
 
 from guara.models import table_registry
-from guara.settings import Settings
+from guara.settings import get_settings
 
 config = context.config
-config.set_main_option('sqlalchemy.url', Settings().DATABASE_URL)
+config.set_main_option('sqlalchemy.url', get_settings().DATABASE_URL)
 
 if config.config_file_name is not None:
     fileConfig(config.config_file_name)
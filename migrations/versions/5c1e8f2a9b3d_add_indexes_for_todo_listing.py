@@ -0,0 +1,39 @@
+"""add indexes for todo listing
+
+Revision ID: 5c1e8f2a9b3d
+Revises: 0987a92b63a4
+Create Date: 2026-10-18 14:30:12.481920
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '5c1e8f2a9b3d'
+down_revision: Union[str, None] = '0987a92b63a4'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_index('ix_todos_user_id_id', 'todos', ['user_id', 'id'], unique=False)
+    op.create_index('ix_todos_user_id_state_id', 'todos', ['user_id', 'state', 'id'], unique=False)
+
+    if op.get_bind().dialect.name == 'postgresql':
+        op.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+        op.create_index('ix_todos_title_trgm', 'todos', ['title'], unique=False, postgresql_using='gin', postgresql_ops={'title': 'gin_trgm_ops'})
+        op.create_index('ix_todos_description_trgm', 'todos', ['description'], unique=False, postgresql_using='gin', postgresql_ops={'description': 'gin_trgm_ops'})
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    if op.get_bind().dialect.name == 'postgresql':
+        op.drop_index('ix_todos_description_trgm', table_name='todos', postgresql_using='gin')
+        op.drop_index('ix_todos_title_trgm', table_name='todos', postgresql_using='gin')
+
+    op.drop_index('ix_todos_user_id_state_id', table_name='todos')
+    op.drop_index('ix_todos_user_id_id', table_name='todos')
@@ -0,0 +1,77 @@
+"""add full text search to todos
+
+Revision ID: a3f7d2e1c0b4
+Revises: 5c1e8f2a9b3d
+Create Date: 2026-10-18 15:02:44.107315
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'a3f7d2e1c0b4'
+down_revision: Union[str, None] = '5c1e8f2a9b3d'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    dialect = op.get_bind().dialect.name
+
+    if dialect == 'postgresql':
+        op.execute("""
+            ALTER TABLE todos ADD COLUMN search_vector tsvector
+            GENERATED ALWAYS AS (
+                setweight(to_tsvector('simple', title), 'A')
+                || setweight(to_tsvector('simple', description), 'B')
+            ) STORED
+        """)
+        op.create_index('ix_todos_search_vector', 'todos', ['search_vector'], unique=False, postgresql_using='gin')
+
+    elif dialect == 'sqlite':
+        op.execute("""
+            CREATE VIRTUAL TABLE todos_fts USING fts5(
+                title, description, content='todos', content_rowid='id'
+            )
+        """)
+        op.execute("""
+            CREATE TRIGGER todos_fts_insert AFTER INSERT ON todos BEGIN
+                INSERT INTO todos_fts (rowid, title, description)
+                VALUES (new.id, new.title, new.description);
+            END
+        """)
+        op.execute("""
+            CREATE TRIGGER todos_fts_delete AFTER DELETE ON todos BEGIN
+                INSERT INTO todos_fts (todos_fts, rowid, title, description)
+                VALUES ('delete', old.id, old.title, old.description);
+            END
+        """)
+        op.execute("""
+            CREATE TRIGGER todos_fts_update AFTER UPDATE OF title, description
+            ON todos BEGIN
+                INSERT INTO todos_fts (todos_fts, rowid, title, description)
+                VALUES ('delete', old.id, old.title, old.description);
+                INSERT INTO todos_fts (rowid, title, description)
+                VALUES (new.id, new.title, new.description);
+            END
+        """)
+        op.execute("INSERT INTO todos_fts (todos_fts) VALUES ('rebuild')")
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    dialect = op.get_bind().dialect.name
+
+    if dialect == 'postgresql':
+        op.drop_index('ix_todos_search_vector', table_name='todos', postgresql_using='gin')
+        op.drop_column('todos', 'search_vector')
+
+    elif dialect == 'sqlite':
+        op.execute('DROP TRIGGER todos_fts_update')
+        op.execute('DROP TRIGGER todos_fts_delete')
+        op.execute('DROP TRIGGER todos_fts_insert')
+        op.execute('DROP TABLE todos_fts')
@@ -0,0 +1,28 @@
+"""add token_version to users
+
+Revision ID: b8c2d4f6a1e3
+Revises: e6b41c7d93a2
+Create Date: 2026-10-18 18:02:41.221930
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b8c2d4f6a1e3'
+down_revision: Union[str, None] = 'e6b41c7d93a2'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('users', sa.Column('token_version', sa.Integer(), server_default='0', nullable=False))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column('users', 'token_version')
@@ -0,0 +1,34 @@
+"""cascade todos on user delete
+
+Revision ID: c4e9a7b2d5f1
+Revises: b8c2d4f6a1e3
+Create Date: 2026-10-18 19:11:37.604218
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c4e9a7b2d5f1'
+down_revision: Union[str, None] = 'b8c2d4f6a1e3'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # SQLite would need todos rebuilt (losing its triggers) to change the
+    # constraint, and only enforces it under PRAGMA foreign_keys anyway;
+    # guara deletes a user's todos itself before the user row.
+    if op.get_bind().dialect.name == 'postgresql':
+        op.drop_constraint('todos_user_id_fkey', 'todos', type_='foreignkey')
+        op.create_foreign_key('todos_user_id_fkey', 'todos', 'users', ['user_id'], ['id'], ondelete='CASCADE')
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    if op.get_bind().dialect.name == 'postgresql':
+        op.drop_constraint('todos_user_id_fkey', 'todos', type_='foreignkey')
+        op.create_foreign_key('todos_user_id_fkey', 'todos', 'users', ['user_id'], ['id'])
@@ -0,0 +1,28 @@
+"""add trash purge index
+
+Revision ID: d1f3b5a7c9e2
+Revises: c4e9a7b2d5f1
+Create Date: 2026-10-18 20:04:52.118306
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'd1f3b5a7c9e2'
+down_revision: Union[str, None] = 'c4e9a7b2d5f1'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_index('ix_todos_trash_updated_at', 'todos', ['updated_at'], unique=False, postgresql_where=sa.text("state = 'trash'"), sqlite_where=sa.text("state = 'trash'"))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_todos_trash_updated_at', table_name='todos', postgresql_where=sa.text("state = 'trash'"), sqlite_where=sa.text("state = 'trash'"))
@@ -0,0 +1,124 @@
+"""add todo counters
+
+Revision ID: e6b41c7d93a2
+Revises: a3f7d2e1c0b4
+Create Date: 2026-10-18 16:20:05.513042
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e6b41c7d93a2'
+down_revision: Union[str, None] = 'a3f7d2e1c0b4'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+POSTGRES_TRIGGERS = {
+    'insert': (
+        'NEW TABLE AS new_rows',
+        'SELECT user_id, state, 1 AS delta FROM new_rows',
+    ),
+    'delete': (
+        'OLD TABLE AS old_rows',
+        'SELECT user_id, state, -1 AS delta FROM old_rows',
+    ),
+    'update': (
+        'OLD TABLE AS old_rows NEW TABLE AS new_rows',
+        'SELECT user_id, state, 1 AS delta FROM new_rows '
+        'UNION ALL SELECT user_id, state, -1 FROM old_rows',
+    ),
+}
+
+SQLITE_UPSERT = """
+    INSERT INTO todo_counters (user_id, state, count)
+    VALUES ({row}.user_id, {row}.state, {delta})
+    ON CONFLICT (user_id, state)
+    DO UPDATE SET count = todo_counters.count + excluded.count;
+"""
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    dialect = op.get_bind().dialect.name
+
+    if dialect == 'postgresql':
+        state = postgresql.ENUM('draft', 'todo', 'doing', 'done', 'trash', name='todostate', create_type=False)
+    else:
+        state = sa.Enum('draft', 'todo', 'doing', 'done', 'trash', name='todostate')
+
+    op.create_table('todo_counters',
+    sa.Column('user_id', sa.Integer(), nullable=False),
+    sa.Column('state', state, nullable=False),
+    sa.Column('count', sa.Integer(), nullable=False),
+    sa.PrimaryKeyConstraint('user_id', 'state')
+    )
+
+    if dialect == 'postgresql':
+        for operation, (transition, changes) in POSTGRES_TRIGGERS.items():
+            op.execute(f"""
+                CREATE OR REPLACE FUNCTION todo_counters_{operation}()
+                RETURNS trigger LANGUAGE plpgsql AS $$
+                BEGIN
+                    INSERT INTO todo_counters (user_id, state, count)
+                    SELECT user_id, state, sum(delta) FROM ({changes}) AS changes
+                    GROUP BY user_id, state
+                    HAVING sum(delta) <> 0
+                    ORDER BY user_id, state
+                    ON CONFLICT (user_id, state)
+                    DO UPDATE SET count = todo_counters.count + excluded.count;
+                    RETURN NULL;
+                END
+                $$
+            """)
+            op.execute(f"""
+                CREATE TRIGGER todo_counters_{operation}
+                AFTER {operation.upper()} ON todos
+                REFERENCING {transition}
+                FOR EACH STATEMENT EXECUTE FUNCTION todo_counters_{operation}()
+            """)
+        op.execute('LOCK TABLE todos IN SHARE MODE')
+
+    elif dialect == 'sqlite':
+        op.execute(f"""
+            CREATE TRIGGER todo_counters_insert AFTER INSERT ON todos BEGIN
+                {SQLITE_UPSERT.format(row='new', delta=1)}
+            END
+        """)
+        op.execute(f"""
+            CREATE TRIGGER todo_counters_delete AFTER DELETE ON todos BEGIN
+                {SQLITE_UPSERT.format(row='old', delta=-1)}
+            END
+        """)
+        op.execute(f"""
+            CREATE TRIGGER todo_counters_update AFTER UPDATE OF state, user_id
+            ON todos
+            WHEN old.state IS NOT new.state OR old.user_id IS NOT new.user_id
+            BEGIN
+                {SQLITE_UPSERT.format(row='old', delta=-1)}
+                {SQLITE_UPSERT.format(row='new', delta=1)}
+            END
+        """)
+
+    op.execute("""
+        INSERT INTO todo_counters (user_id, state, count)
+        SELECT user_id, state, count(*) FROM todos GROUP BY user_id, state
+    """)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    dialect = op.get_bind().dialect.name
+
+    for operation in POSTGRES_TRIGGERS:
+        if dialect == 'postgresql':
+            op.execute(f'DROP TRIGGER todo_counters_{operation} ON todos')
+            op.execute(f'DROP FUNCTION todo_counters_{operation}()')
+        elif dialect == 'sqlite':
+            op.execute(f'DROP TRIGGER todo_counters_{operation}')
+
+    op.drop_table('todo_counters')
@@ -0,0 +1,115 @@
+"""optionally hash partition todos
+
+Off unless asked for, since it rewrites the whole table under an
+exclusive lock; run it in a maintenance window with
+
+    alembic -x todo_partitions=16 upgrade head
+
+To partition a database already past this revision, downgrade one step
+and upgrade again with the option. Downgrading turns a partitioned
+table back into a plain one the same way. PostgreSQL only.
+
+Revision ID: f2a4c6e8b0d3
+Revises: d1f3b5a7c9e2
+Create Date: 2026-10-18 21:26:03.410877
+
+"""
+from typing import Sequence, Union
+
+from alembic import context, op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'f2a4c6e8b0d3'
+down_revision: Union[str, None] = 'd1f3b5a7c9e2'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+COLUMNS = 'id, title, description, state, user_id, created_at, updated_at'
+
+INDEXES = [
+    'CREATE INDEX ix_todos_user_id_state_id ON todos (user_id, state, id)',
+    'CREATE INDEX ix_todos_title_trgm ON todos USING gin (title gin_trgm_ops)',
+    'CREATE INDEX ix_todos_description_trgm ON todos USING gin (description gin_trgm_ops)',
+    'CREATE INDEX ix_todos_search_vector ON todos USING gin (search_vector)',
+    "CREATE INDEX ix_todos_trash_updated_at ON todos (updated_at) WHERE state = 'trash'",
+]
+
+COUNTER_TRIGGERS = {
+    'insert': 'NEW TABLE AS new_rows',
+    'delete': 'OLD TABLE AS old_rows',
+    'update': 'OLD TABLE AS old_rows NEW TABLE AS new_rows',
+}
+
+
+def is_partitioned() -> bool:
+    relkind = op.get_bind().scalar(
+        sa.text("SELECT relkind FROM pg_class WHERE oid = 'todos'::regclass")
+    )
+    return relkind == 'p'
+
+
+def rebuild_todos(partitions: int | None) -> None:
+    """Copy todos into a new table, hash partitioned or plain, and swap it in.
+
+    A partitioned table's primary key has to contain the partition key, so
+    it becomes (user_id, id), which also serves the (user_id, id) lookups
+    ix_todos_user_id_id is there for on a plain table. ids still come from
+    the one sequence, so they stay unique across partitions.
+    """
+    op.execute('LOCK TABLE todos IN ACCESS EXCLUSIVE MODE')
+
+    partition_by = ' PARTITION BY HASH (user_id)' if partitions else ''
+    op.execute(f"""
+        CREATE TABLE todos_new (
+            LIKE todos INCLUDING DEFAULTS INCLUDING GENERATED
+        ){partition_by}
+    """)
+    for remainder in range(partitions or 0):
+        op.execute(f"""
+            CREATE TABLE todos_p{remainder} PARTITION OF todos_new
+            FOR VALUES WITH (MODULUS {partitions}, REMAINDER {remainder})
+        """)
+
+    # indexes and triggers come after the copy: building an index once is
+    # far cheaper than maintaining it row by row, and the counters are
+    # already right for these rows
+    op.execute(f'INSERT INTO todos_new ({COLUMNS}) SELECT {COLUMNS} FROM todos')
+    op.execute('ALTER SEQUENCE todos_id_seq OWNED BY todos_new.id')
+    op.execute('DROP TABLE todos')
+    op.execute('ALTER TABLE todos_new RENAME TO todos')
+
+    if partitions:
+        op.execute('ALTER TABLE todos ADD CONSTRAINT todos_pkey PRIMARY KEY (user_id, id)')
+    else:
+        op.execute('ALTER TABLE todos ADD CONSTRAINT todos_pkey PRIMARY KEY (id)')
+        op.execute('CREATE INDEX ix_todos_user_id_id ON todos (user_id, id)')
+    op.execute("""
+        ALTER TABLE todos ADD CONSTRAINT todos_user_id_fkey
+        FOREIGN KEY (user_id) REFERENCES users (id) ON DELETE CASCADE
+    """)
+    for index in INDEXES:
+        op.execute(index)
+
+    for operation, transition in COUNTER_TRIGGERS.items():
+        op.execute(f"""
+            CREATE TRIGGER todo_counters_{operation}
+            AFTER {operation.upper()} ON todos
+            REFERENCING {transition}
+            FOR EACH STATEMENT EXECUTE FUNCTION todo_counters_{operation}()
+        """)
+    op.execute('ANALYZE todos')
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    partitions = context.get_x_argument(as_dictionary=True).get('todo_partitions')
+    if partitions and op.get_bind().dialect.name == 'postgresql':
+        rebuild_todos(int(partitions))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    if op.get_bind().dialect.name == 'postgresql' and is_partitioned():
+        rebuild_todos(None)
@@ -1,5 +1,8 @@
+import asyncio
+import time
 from contextlib import contextmanager
 from datetime import datetime
+from functools import partial
 
 import factory
 import factory.fuzzy
@@ -10,10 +13,15 @@ from sqlalchemy import event
 from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
 from testcontainers.postgres import PostgresContainer
 
+from guara import security
 from guara.app import app
+from guara.cache import MemoryCache, user_cache
 from guara.database import get_session
+from guara.deletion import deletion_jobs
 from guara.models import User, table_registry
-from guara.security import get_password_hash
+from guara.ratelimit import MemoryBuckets, login_limiter
+from guara.replicas import recent_writes
+from guara.security import TokenCache, get_password_hash, token_revocations
 
 
 class UserFactory(factory.Factory):
@@ -25,6 +33,17 @@ class UserFactory(factory.Factory):
     password = factory.LazyAttribute(lambda obj: f'{obj.username}_password')
 
 
+@pytest.fixture(autouse=True)
+def _fresh_user_cache(monkeypatch):
+    # ids restart with every test database, so cached rows must not leak
+    monkeypatch.setattr(user_cache, 'backend', MemoryCache(100))
+    monkeypatch.setattr(recent_writes, 'backend', MemoryCache(100))
+    monkeypatch.setattr(login_limiter, 'buckets', MemoryBuckets(100))
+    monkeypatch.setattr(token_revocations, 'backend', MemoryCache(100))
+    monkeypatch.setattr(security, 'token_cache', TokenCache(100))
+    monkeypatch.setattr(deletion_jobs, 'backend', MemoryCache(100))
+
+
 @pytest.fixture(scope='session')
 def engine():
     with PostgresContainer('postgres:16', driver='psycopg') as postgres:
@@ -76,6 +95,29 @@ def mock_db_time():
     return _mock_db_time
 
 
+@contextmanager
+def _count_queries(*, engine):
+    statements = []
+
+    def before_cursor_execute(conn, cursor, statement, *args):
+        statements.append(statement)
+
+    event.listen(
+        engine.sync_engine, 'before_cursor_execute', before_cursor_execute
+    )
+
+    yield statements
+
+    event.remove(
+        engine.sync_engine, 'before_cursor_execute', before_cursor_execute
+    )
+
+
+@pytest.fixture
+def count_queries(engine):
+    return partial(_count_queries, engine=engine)
+
+
 @pytest_asyncio.fixture
 async def user(session):
     password = 'secret'
@@ -114,3 +156,67 @@ def token(client, user):
         },
     )
     return response.json()['access_token']
+
+
+async def _serve_resp(store, reader, writer):
+    """Tiny stand-in for a Redis server: the few commands guara sends."""
+    expires = {}
+
+    def alive(key):
+        if key in expires and expires[key] <= time.monotonic():
+            store.pop(key, None)
+            expires.pop(key, None)
+        return key in store
+
+    while header := await reader.readline():
+        args = []
+        for _ in range(int(header[1:])):
+            length = int((await reader.readline())[1:])
+            args.append((await reader.readexactly(length + 2))[:-2])
+
+        command, key, *rest = args
+        if command == b'GET':
+            value = store[key] if alive(key) else None
+            reply = (
+                b'$-1\r\n'
+                if value is None
+                else b'$%d\r\n%s\r\n' % (len(value), value)
+            )
+        elif command == b'SET':
+            if b'NX' in rest and alive(key):
+                reply = b'$-1\r\n'
+            else:
+                store[key] = rest[0]
+                expires.pop(key, None)
+                if b'PX' in rest:
+                    ttl = int(rest[rest.index(b'PX') + 1]) / 1000
+                    expires[key] = time.monotonic() + ttl
+                reply = b'+OK\r\n'
+        elif command == b'DEL':
+            removed = sum(
+                store.pop(name, None) is not None for name in [key, *rest]
+            )
+            reply = b':%d\r\n' % removed
+        elif command == b'INCR':
+            value = int(store[key]) + 1 if alive(key) else 1
+            store[key] = b'%d' % value
+            reply = b':%d\r\n' % value
+        elif command == b'PTTL':
+            remaining = expires.get(key, 0) - time.monotonic()
+            ttl = int(remaining * 1000) if key in expires else -1
+            reply = b':%d\r\n' % (ttl if alive(key) else -2)
+        else:
+            reply = b'-ERR unknown command\r\n'
+        writer.write(reply)
+        await writer.drain()
+    writer.close()
+
+
+@pytest_asyncio.fixture
+async def redis_url():
+    server = await asyncio.start_server(
+        partial(_serve_resp, {}), '127.0.0.1', 0
+    )
+    port = server.sockets[0].getsockname()[1]
+    yield f'redis://127.0.0.1:{port}/0'
+    server.close()
@@ -23,3 +23,12 @@ def test_root_html_should_ok_and_html_response(client):
     </html>
     """
     )
+
+
+def test_pool_stats_should_report_pool_usage(client):
+    response = client.get('/stats/pool')
+
+    assert response.status_code == HTTPStatus.OK
+    assert {'size', 'checked_out', 'overflow', 'timeouts'} <= set(
+        response.json()
+    )
@@ -1,8 +1,19 @@
 from http import HTTPStatus
 
+import pytest
 from freezegun import freeze_time
+from pwdlib import PasswordHash
+from pwdlib.hashers.argon2 import Argon2Hasher
 
-from guara.security import create_access_token
+from guara import security
+from guara.cache import MemoryCache, RedisCache, user_cache
+from guara.ratelimit import login_limiter
+from guara.security import create_access_token, settings, token_revocations
+
+
+@pytest.fixture
+def stateless(monkeypatch):
+    monkeypatch.setattr(settings, 'AUTH_STATELESS', True)
 
 
 def test_get_token(client, user):
@@ -71,6 +82,18 @@ def test_token_expired_after_time(client, user):
         assert response.json() == {'detail': 'Could not validate credentials'}
 
 
+def test_get_current_user_single_query(client, token, count_queries):
+    with count_queries() as queries:
+        response = client.post(
+            '/auth/refresh_token',
+            headers={'Authorization': f'Bearer {token}'},
+        )
+
+    assert response.status_code == HTTPStatus.OK
+    assert len(queries) == 1
+    assert 'todos' not in queries[0]
+
+
 def test_token_inexistent_user(client):
     response = client.post(
         '/auth/token',
@@ -128,3 +151,156 @@ def test_token_expired_dont_refresh(client, user):
 
         assert response.status_code == HTTPStatus.UNAUTHORIZED
         assert response.json() == {'detail': 'Could not validate credentials'}
+
+
+def test_token_should_shed_client_flood_before_hashing(
+    client, user, monkeypatch
+):
+    burst = 3
+    monkeypatch.setattr(login_limiter, 'client_burst', burst)
+    before = login_limiter.stats()
+    credentials = {'username': user.email, 'password': 'wrong'}
+
+    responses = [
+        client.post('/auth/token', data=credentials) for _ in range(burst + 2)
+    ]
+
+    assert [r.status_code for r in responses] == [
+        HTTPStatus.UNAUTHORIZED
+    ] * burst + [HTTPStatus.TOO_MANY_REQUESTS] * 2
+    assert responses[-1].headers['Retry-After'] == '1'
+    stats = login_limiter.stats()
+    assert stats['admitted'] == before['admitted'] + burst
+    assert stats['shed_client'] == before['shed_client'] + 2
+
+
+def test_token_should_shed_attempts_per_account(client, user, monkeypatch):
+    monkeypatch.setattr(login_limiter, 'account_burst', 1)
+    shed = login_limiter.stats()['shed_account']
+    client.post(
+        '/auth/token', data={'username': user.email, 'password': 'wrong'}
+    )
+
+    response = client.post(
+        '/auth/token',
+        data={'username': user.email.upper(), 'password': user.clean_password},
+    )
+
+    assert response.status_code == HTTPStatus.TOO_MANY_REQUESTS
+    assert response.json() == {'detail': 'Too many login attempts'}
+    assert login_limiter.stats()['shed_account'] == shed + 1
+
+
+def test_stateless_auth_should_skip_user_lookup(
+    client, token, count_queries, stateless
+):
+    headers = {'Authorization': f'Bearer {token}'}
+    lookups = user_cache.hits + user_cache.misses
+
+    with count_queries() as queries:
+        response = client.get('/todos/', headers=headers)
+
+    assert response.status_code == HTTPStatus.OK
+    assert not any('FROM users' in query for query in queries)
+    assert user_cache.hits + user_cache.misses == lookups
+
+
+def test_stateless_token_should_be_revoked_by_user_update(
+    client, user, token, stateless
+):
+    headers = {'Authorization': f'Bearer {token}'}
+    rejected = token_revocations.rejected
+    client.put(
+        f'/users/{user.id}',
+        headers=headers,
+        json={
+            'username': user.username,
+            'email': user.email,
+            'password': 'new_password',
+        },
+    )
+
+    response = client.get('/todos/', headers=headers)
+
+    assert response.status_code == HTTPStatus.UNAUTHORIZED
+    assert token_revocations.stats()['rejected'] == rejected + 1
+
+    response = client.post(
+        '/auth/token',
+        data={'username': user.email, 'password': 'new_password'},
+    )
+    fresh = {'Authorization': f'Bearer {response.json()["access_token"]}'}
+
+    assert client.get('/todos/', headers=fresh).status_code == HTTPStatus.OK
+
+
+def test_stateless_token_should_be_revoked_by_user_delete(
+    client, user, token, stateless
+):
+    headers = {'Authorization': f'Bearer {token}'}
+    client.delete(f'/users/{user.id}', headers=headers)
+
+    response = client.post(
+        '/todos/',
+        headers=headers,
+        json={'title': 'x', 'description': 'x', 'state': 'todo'},
+    )
+
+    assert response.status_code == HTTPStatus.UNAUTHORIZED
+
+
+def test_stateless_refresh_should_check_token_version_in_database(
+    client, user, token, stateless, monkeypatch
+):
+    headers = {'Authorization': f'Bearer {token}'}
+    client.put(
+        f'/users/{user.id}',
+        headers=headers,
+        json={
+            'username': user.username,
+            'email': user.email,
+            'password': 'new_password',
+        },
+    )
+    # a worker that never saw the revocation, or one restarted since
+    monkeypatch.setattr(token_revocations, 'backend', MemoryCache(10))
+
+    response = client.post('/auth/refresh_token', headers=headers)
+
+    assert response.status_code == HTTPStatus.UNAUTHORIZED
+
+
+def test_stateless_auth_should_load_user_when_revocations_are_down(
+    client, token, stateless, monkeypatch
+):
+    errors = token_revocations.errors
+    monkeypatch.setattr(
+        token_revocations, 'backend', RedisCache('redis://127.0.0.1:1')
+    )
+
+    response = client.get(
+        '/todos/', headers={'Authorization': f'Bearer {token}'}
+    )
+
+    assert response.status_code == HTTPStatus.OK
+    assert token_revocations.stats()['errors'] == errors + 1
+
+
+def test_login_should_rehash_password_with_stale_costs(
+    client, user, count_queries, monkeypatch
+):
+    form = {'username': user.email, 'password': user.clean_password}
+    cheaper = PasswordHash((Argon2Hasher(time_cost=1, memory_cost=64),))
+    monkeypatch.setattr(security, 'get_password_context', lambda: cheaper)
+
+    with count_queries() as first:
+        assert (
+            client.post('/auth/token', data=form).status_code == HTTPStatus.OK
+        )
+    with count_queries() as second:
+        assert (
+            client.post('/auth/token', data=form).status_code == HTTPStatus.OK
+        )
+
+    assert any(query.startswith('UPDATE users') for query in first)
+    assert not any(query.startswith('UPDATE') for query in second)
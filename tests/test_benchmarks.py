@@ -0,0 +1,64 @@
+import random
+
+import pytest
+
+from benchmarks import partitioning, serialization, token_cache
+from benchmarks.harness import open_app, seed
+from benchmarks.workloads import WORKLOADS, run_workload
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize('workload', list(WORKLOADS))
+async def test_workload_should_report_latency_per_endpoint(workload):
+    expected_requests = 20
+
+    async with open_app(None) as (engine, client):
+        seeded = await seed(engine, 2, 10, random.Random(0))
+        report = await run_workload(
+            client,
+            seeded,
+            workload,
+            concurrency=2,
+            requests=expected_requests,
+        )
+
+    assert report['requests'] == expected_requests
+    assert report['errors'] == 0
+    for stats in report['endpoints'].values():
+        assert {'count', 'rps', 'p50_ms', 'p95_ms', 'p99_ms'} <= set(stats)
+
+
+@pytest.mark.asyncio
+async def test_serialization_benchmark_should_report_both_paths():
+    expected_rows = 20
+
+    report = await serialization.run(expected_rows, rounds=1)
+
+    for stats in report.values():
+        assert stats['rows'] == expected_rows
+        assert stats['response_model_ms_per_1k'] > 0
+        assert stats['fast_path_ms_per_1k'] > 0
+
+
+@pytest.mark.asyncio
+async def test_token_cache_benchmark_should_report_both_paths():
+    report = await token_cache.run(requests=10)
+
+    assert report['uncached_us_per_request'] > 0
+    assert report['cached_us_per_request'] > 0
+
+
+@pytest.mark.asyncio
+async def test_partitioning_benchmark_should_report_both_layouts(engine):
+    report = await partitioning.run(
+        engine.url.render_as_string(hide_password=False),
+        rows=50,
+        users=5,
+        partitions=2,
+        batch=20,
+        lists=3,
+    )
+
+    for layout in ('plain', 'partitioned'):
+        assert report[layout]['insert_rows_per_s'] > 0
+        assert report[layout]['list']['p50_ms'] > 0
@@ -0,0 +1,135 @@
+import asyncio
+import socket
+from functools import partial
+from http import HTTPStatus
+
+import pytest
+
+from guara.cache import MemoryCache, RedisCache, UserCache, user_cache
+from guara.models import User
+
+
+async def _echo_key(delay, reader, writer):
+    """Answer every command with its key, ``delay`` seconds late."""
+    while header := await reader.readline():
+        args = []
+        for _ in range(int(header[1:])):
+            length = int((await reader.readline())[1:])
+            args.append((await reader.readexactly(length + 2))[:-2])
+        await asyncio.sleep(delay)
+        writer.write(b'$%d\r\n%s\r\n' % (len(args[1]), args[1]))
+        await writer.drain()
+    writer.close()
+
+
+def _user():
+    user = User(username='cached', password='x', email='cached@test.com')
+    user.id = 1
+    user.created_at = user.updated_at = '2024-01-01T00:00:00'
+    return user
+
+
+@pytest.mark.asyncio
+async def test_memory_cache_should_evict_least_recently_used():
+    cache = MemoryCache(maxsize=2)
+    await cache.set('a', b'1', 60)
+    await cache.set('b', b'2', 60)
+    await cache.get('a')
+    await cache.set('c', b'3', 60)
+
+    assert await cache.get('a') == b'1'
+    assert await cache.get('b') is None
+    assert await cache.get('c') == b'3'
+
+
+@pytest.mark.asyncio
+async def test_memory_cache_should_expire_entries():
+    cache = MemoryCache(maxsize=2)
+    await cache.set('a', b'1', 0)
+
+    assert await cache.get('a') is None
+    assert len(cache) == 0
+
+
+@pytest.mark.asyncio
+async def test_redis_cache_should_round_trip_through_resp(redis_url):
+    cache = UserCache(RedisCache(redis_url), ttl=60)
+    await cache.set(_user())
+
+    assert (await cache.get_by_email('cached@test.com'))['id'] == 1
+    assert (await cache.get_by_id(1))['username'] == 'cached'
+
+    await cache.invalidate(1, 'cached@test.com')
+
+    assert await cache.get_by_id(1) is None
+    assert cache.stats() == {'hits': 2, 'misses': 1, 'errors': 0}
+
+
+@pytest.mark.asyncio
+async def test_redis_cache_outage_should_count_as_miss():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        port = sock.getsockname()[1]
+    cache = UserCache(RedisCache(f'redis://127.0.0.1:{port}'), ttl=60)
+
+    assert await cache.get_by_id(1) is None
+    assert cache.stats() == {'hits': 0, 'misses': 1, 'errors': 1}
+
+
+@pytest.mark.asyncio
+async def test_redis_cache_cancelled_command_should_not_leak_its_reply():
+    server = await asyncio.start_server(
+        partial(_echo_key, 0.05), '127.0.0.1', 0
+    )
+    port = server.sockets[0].getsockname()[1]
+    cache = RedisCache(f'redis://127.0.0.1:{port}')
+
+    pending = asyncio.create_task(cache.get('user:email:alice@x'))
+    await asyncio.sleep(0.01)
+    pending.cancel()
+
+    assert await cache.get('user:email:bob@x') == b'user:email:bob@x'
+    server.close()
+
+
+@pytest.mark.asyncio
+async def test_redis_cache_stalled_server_should_count_as_miss():
+    server = await asyncio.start_server(partial(_echo_key, 60), '127.0.0.1', 0)
+    port = server.sockets[0].getsockname()[1]
+    cache = UserCache(
+        RedisCache(f'redis://127.0.0.1:{port}', timeout=0.05), ttl=60
+    )
+
+    assert await cache.get_by_id(1) is None
+    assert await cache.get_by_id(1) is None
+    assert cache.stats() == {'hits': 0, 'misses': 2, 'errors': 2}
+    server.close()
+
+
+def test_authenticated_requests_should_reuse_cached_user(
+    client, token, count_queries
+):
+    expected_queries = 1
+    headers = {'Authorization': f'Bearer {token}'}
+    client.get('/todos/', headers=headers)
+    hits = user_cache.hits
+
+    with count_queries() as queries:
+        response = client.get('/todos/', headers=headers)
+
+    assert response.status_code == HTTPStatus.OK
+    assert user_cache.hits == hits + 1
+    assert len(queries) == expected_queries
+    assert 'FROM users' not in queries[0]
+
+
+def test_delete_user_should_invalidate_cached_user(client, user, token):
+    headers = {'Authorization': f'Bearer {token}'}
+    client.get(f'/users/{user.id}')
+    client.get('/todos/', headers=headers)
+
+    client.delete(f'/users/{user.id}', headers=headers)
+
+    assert client.get(f'/users/{user.id}').status_code == HTTPStatus.NOT_FOUND
+    response = client.get('/todos/', headers=headers)
+    assert response.status_code == HTTPStatus.UNAUTHORIZED
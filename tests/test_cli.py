@@ -0,0 +1,110 @@
+from argparse import Namespace
+from datetime import datetime
+
+import pytest
+from sqlalchemy import insert, select, update
+from sqlalchemy.ext.asyncio import create_async_engine
+
+from guara import cli
+from guara.models import Todo, TodoCounter, User, table_registry
+
+
+@pytest.fixture
+def sqlite_engine(tmp_path, monkeypatch):
+    engine = create_async_engine(f'sqlite+aiosqlite:///{tmp_path}/cli.db')
+    monkeypatch.setattr(cli, 'get_engine', lambda: engine)
+    return engine
+
+
+@pytest.mark.asyncio
+async def test_reconcile_counters_command(sqlite_engine, capsys):
+    expected_count = 2
+    async with sqlite_engine.begin() as conn:
+        await conn.run_sync(table_registry.metadata.create_all)
+        await conn.execute(
+            insert(User).values(
+                username='cli', email='cli@test.com', password='x'
+            )
+        )
+        await conn.execute(
+            insert(Todo),
+            [{'title': 't', 'description': 'd', 'state': 'todo', 'user_id': 1}]
+            * expected_count,
+        )
+        await conn.execute(update(TodoCounter).values(count=0))
+
+    await cli.run(cli.reconcile, None)
+
+    async with sqlite_engine.connect() as conn:
+        count = await conn.scalar(select(TodoCounter.count))
+    assert count == expected_count
+    assert capsys.readouterr().out == 'Rebuilt 1 todo counters\n'
+
+
+def test_calibrate_hashing_command(capsys):
+    cli.main([
+        'calibrate-hashing',
+        '--target-ms',
+        '50',
+        '--max-memory-mib',
+        '1',
+        '--workers',
+        '2',
+        '--parallelism',
+        '1',
+    ])
+
+    lines = capsys.readouterr().out.splitlines()
+    costs = dict(line.split('=') for line in lines if '=' in line)
+    assert costs['PASSWORD_HASH_MEMORY_COST'] == '512'
+    assert int(costs['PASSWORD_HASH_TIME_COST']) >= 1
+    assert lines[-1].endswith('ms per hash on this host')
+
+
+@pytest.mark.asyncio
+async def test_purge_trash_command(sqlite_engine, capsys):
+    old, recent = datetime(2000, 1, 1), datetime.now()
+    async with sqlite_engine.begin() as conn:
+        await conn.run_sync(table_registry.metadata.create_all)
+        await conn.execute(
+            insert(User).values(
+                username='cli', email='cli@test.com', password='x'
+            )
+        )
+        await conn.execute(
+            insert(Todo),
+            [
+                {
+                    'title': 't',
+                    'description': 'd',
+                    'user_id': 1,
+                    'state': state,
+                    'updated_at': updated_at,
+                }
+                for state, updated_at in [
+                    ('trash', old),
+                    ('trash', old),
+                    ('trash', old),
+                    ('trash', recent),
+                    ('todo', old),
+                ]
+            ],
+        )
+
+    await cli.run(
+        cli.purge_trash, Namespace(retention_days=30, batch_size=2, pause=0)
+    )
+
+    async with sqlite_engine.connect() as conn:
+        states = (await conn.scalars(select(Todo.state))).all()
+    assert sorted(states) == ['todo', 'trash']
+    assert capsys.readouterr().out == 'Purged 3 trashed todos\n'
+
+
+def test_profile_startup_command(capsys):
+    cli.main(['profile-startup', '--top', '3'])
+
+    out = capsys.readouterr().out
+    assert out.startswith('import guara.app')
+    for name in ['engine', 'password_context', 'guara.app', 'guara.database']:
+        assert name in out
@@ -2,8 +2,15 @@ from dataclasses import asdict
 
 import pytest
 from sqlalchemy import select
+from sqlalchemy.exc import InvalidRequestError
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+from sqlalchemy.ext.asyncio import create_async_engine
+from sqlalchemy.orm import selectinload
+from sqlalchemy.pool import NullPool
 
+from guara.database import InstrumentedPool, engine_options, get_engine
 from guara.models import Todo, User
+from guara.settings import Settings, get_settings
 
 
 @pytest.mark.asyncio
@@ -15,13 +22,18 @@ async def test_create_user(session, mock_db_time):
         session.add(new_user)
         await session.commit()
 
-    user = await session.scalar(select(User).where(User.username == 'Gdel'))
+    user = await session.scalar(
+        select(User)
+        .options(selectinload(User.todos))
+        .where(User.username == 'Gdel')
+    )
 
     assert asdict(user) == {
         'id': 1,
         'username': 'Gdel',
         'password': 'secret',
         'email': 'Gdel@gmail.com',
+        'token_version': 0,
         'created_at': time,
         'updated_at': time,
         'todos': [],
@@ -66,6 +78,105 @@ async def test_user_todo_relationship(session, user: User):
     await session.commit()
     await session.refresh(user)
 
-    user = await session.scalar(select(User).where(User.id == user.id))
+    user = await session.scalar(
+        select(User)
+        .options(selectinload(User.todos))
+        .where(User.id == user.id)
+    )
 
     assert user.todos == [todo]
+
+
+@pytest.mark.asyncio
+async def test_user_todos_not_loaded_by_default(session, user: User):
+    session.add(
+        Todo(
+            title='Test Todo',
+            description='Test Description',
+            state='draft',
+            user_id=user.id,
+        )
+    )
+    await session.commit()
+    session.expunge_all()
+
+    user = await session.scalar(select(User).where(User.id == user.id))
+
+    with pytest.raises(InvalidRequestError):
+        user.todos
+
+
+@pytest.mark.asyncio
+async def test_delete_user_cascades_todos(session, user: User):
+    session.add(
+        Todo(
+            title='Test Todo',
+            description='Test Description',
+            state='draft',
+            user_id=user.id,
+        )
+    )
+    await session.commit()
+
+    await session.delete(user)
+    await session.commit()
+
+    assert await session.scalar(select(Todo)) is None
+
+
+def test_engine_options_should_size_the_pool():
+    settings = Settings(DATABASE_POOL_SIZE=3, DATABASE_MAX_OVERFLOW=0)
+
+    options = engine_options(settings)
+
+    assert options['poolclass'] is InstrumentedPool
+    assert options['pool_size'] == settings.DATABASE_POOL_SIZE
+    assert options['max_overflow'] == 0
+
+
+def test_engine_options_for_transaction_pooling():
+    settings = Settings(
+        DATABASE_NULL_POOL=True, DATABASE_DISABLE_PREPARED_STATEMENTS=True
+    )
+
+    options = engine_options(settings)
+
+    assert options['poolclass'] is NullPool
+    assert 'pool_size' not in options
+    assert options['connect_args'] == {'prepare_threshold': None}
+
+
+def test_settings_and_engine_should_be_built_once():
+    assert get_settings() is get_settings()
+    assert get_engine() is get_engine()
+    assert get_engine().url.render_as_string(hide_password=False) == (
+        get_settings().DATABASE_URL
+    )
+
+
+@pytest.mark.asyncio
+async def test_instrumented_pool_should_record_waits_and_timeouts(tmp_path):
+    pool_timeout = 0.1
+    engine = create_async_engine(
+        f'sqlite+aiosqlite:///{tmp_path / "pool.db"}',
+        poolclass=InstrumentedPool,
+        pool_size=1,
+        max_overflow=0,
+        pool_timeout=pool_timeout,
+    )
+    expected_checkouts = 2
+
+    async with engine.connect():
+        assert engine.pool.stats()['checked_out'] == 1
+
+        with pytest.raises(PoolTimeoutError):
+            async with engine.connect():
+                pass
+
+    stats = engine.pool.stats()
+    assert stats['checked_out'] == 0
+    assert stats['checkouts'] == expected_checkouts
+    assert stats['timeouts'] == 1
+    assert stats['wait_seconds_max'] >= pool_timeout
+
+    await engine.dispose()
@@ -0,0 +1,65 @@
+from http import HTTPStatus
+
+from guara.metrics import GaugeCallback, Histogram
+
+
+def test_histogram_should_render_cumulative_buckets():
+    histogram = Histogram('latency', 'Latency.', ('route',), buckets=(1, 5))
+
+    histogram.observe(0.5, '/a')
+    histogram.observe(3, '/a')
+    histogram.observe(10, '/a')
+
+    assert histogram.render() == [
+        '# HELP latency Latency.',
+        '# TYPE latency histogram',
+        'latency_bucket{route="/a",le="1"} 1',
+        'latency_bucket{route="/a",le="5"} 2',
+        'latency_bucket{route="/a",le="+Inf"} 3',
+        'latency_sum{route="/a"} 13.5',
+        'latency_count{route="/a"} 3',
+    ]
+
+
+def test_gauge_callback_should_read_values_at_render():
+    values = {'size': 1}
+    gauge = GaugeCallback('pool', 'Pool.', lambda: values)
+
+    values['size'] = 2
+
+    assert gauge.render() == [
+        '# HELP pool_size Pool.',
+        '# TYPE pool_size gauge',
+        'pool_size 2',
+    ]
+
+
+def test_metrics_should_expose_route_db_and_hash_timings(client, user):
+    client.get(f'/users/{user.id}')
+    client.post(
+        '/auth/token',
+        data={'username': user.email, 'password': user.clean_password},
+    )
+
+    response = client.get('/metrics')
+
+    assert response.status_code == HTTPStatus.OK
+    assert response.headers['content-type'].startswith('text/plain')
+    body = response.text
+    assert (
+        'http_request_duration_seconds_count'
+        '{method="GET",route="/users/{user_id}",status="200"}'
+    ) in body
+    assert 'db_statement_duration_seconds_count{operation="SELECT"}' in body
+    assert 'password_hash_duration_seconds_count{operation="verify"}' in body
+    assert 'db_pool_checked_out' in body
+    assert 'password_hasher_queued' in body
+
+
+def test_metrics_should_not_label_unmatched_paths(client):
+    client.get('/does-not-exist/123')
+
+    body = client.get('/metrics').text
+
+    assert 'route="<unmatched>",status="404"' in body
+    assert '/does-not-exist/123' not in body
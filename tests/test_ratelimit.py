@@ -0,0 +1,44 @@
+import pytest
+
+from guara.cache import RedisCache
+from guara.ratelimit import LoginLimiter, MemoryBuckets, RedisBuckets
+
+
+@pytest.mark.asyncio
+async def test_memory_buckets_should_refill_at_rate(monkeypatch):
+    now = 100.0
+    monkeypatch.setattr('guara.ratelimit.time.monotonic', lambda: now)
+    buckets = MemoryBuckets(maxsize=10)
+
+    assert await buckets.take('key', rate=2, burst=2) == 0
+    assert await buckets.take('key', rate=2, burst=2) == 0
+    assert await buckets.take('key', rate=2, burst=2) == pytest.approx(0.5)
+
+    now += 0.5
+
+    assert await buckets.take('key', rate=2, burst=2) == 0
+
+
+@pytest.mark.asyncio
+async def test_redis_buckets_should_share_a_window(redis_url):
+    burst = 2
+    workers = [RedisBuckets(RedisCache(redis_url)) for _ in range(2)]
+
+    waits = [
+        await worker.take('login:client:1', rate=1, burst=burst)
+        for worker in workers * 2
+    ]
+
+    assert waits[:burst] == [0, 0]
+    assert all(0 < wait <= burst for wait in waits[burst:])
+
+
+@pytest.mark.asyncio
+async def test_login_limiter_should_admit_when_backend_is_down():
+    expected_errors = 2
+    limiter = LoginLimiter(
+        RedisBuckets(RedisCache('redis://127.0.0.1:1')), 1, 1, 1, 1
+    )
+
+    assert await limiter.admit('client', 'user@test.com') == 0
+    assert limiter.stats()['errors'] == expected_errors
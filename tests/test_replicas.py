@@ -0,0 +1,62 @@
+from http import HTTPStatus
+
+import pytest_asyncio
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+
+from guara.app import app
+from guara.database import get_replica_session
+from guara.models import table_registry
+from guara.settings import Settings
+
+
+@pytest_asyncio.fixture
+async def replica(tmp_path):
+    # An empty database standing in for a replica that hasn't caught up.
+    engine = create_async_engine(f'sqlite+aiosqlite:///{tmp_path}/replica.db')
+    async with engine.begin() as conn:
+        await conn.run_sync(table_registry.metadata.create_all)
+
+    async with AsyncSession(engine, expire_on_commit=False) as session:
+        app.dependency_overrides[get_replica_session] = lambda: session
+        yield session
+
+    await engine.dispose()
+
+
+def test_reads_should_use_replica_until_own_write(client, token, replica):
+    headers = {'Authorization': f'Bearer {token}'}
+    todo = {'title': 'Mine', 'description': 'Desc', 'state': 'todo'}
+
+    assert client.get('/todos/', headers=headers).json()['todos'] == []
+
+    client.post('/todos/', headers=headers, json=todo)
+
+    todos = client.get('/todos/', headers=headers).json()['todos']
+    assert [todo['title'] for todo in todos] == ['Mine']
+
+
+def test_get_user_should_read_primary_after_update(
+    client, user, token, replica
+):
+    assert client.get(f'/users/{user.id}').status_code == HTTPStatus.NOT_FOUND
+
+    client.put(
+        f'/users/{user.id}',
+        headers={'Authorization': f'Bearer {token}'},
+        json={'username': 'moved', 'email': user.email, 'password': 'secret'},
+    )
+
+    response = client.get(f'/users/{user.id}')
+    assert response.json()['username'] == 'moved'
+    assert client.get('/users/').json()['users'][0]['username'] == 'moved'
+
+
+def test_replica_urls_should_accept_comma_separated_list(monkeypatch):
+    monkeypatch.setenv(
+        'DATABASE_REPLICA_URLS', 'sqlite:///a.db, sqlite:///b.db'
+    )
+
+    assert Settings().DATABASE_REPLICA_URLS == [
+        'sqlite:///a.db',
+        'sqlite:///b.db',
+    ]
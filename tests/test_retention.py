@@ -0,0 +1,52 @@
+import pytest
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+
+from guara.models import Todo, TodoState
+from guara.retention import TrashPurger
+from tests.test_todos import TodoFactory
+
+
+@pytest.mark.asyncio
+async def test_trash_purger_should_only_remove_expired_trash(
+    session, user, mock_db_time
+):
+    expected_purged = 5
+    with mock_db_time(model=Todo):
+        session.add_all(
+            TodoFactory.create_batch(
+                expected_purged, user_id=user.id, state=TodoState.trash
+            )
+        )
+        session.add(TodoFactory(user_id=user.id, state=TodoState.done))
+        await session.commit()
+    session.add(TodoFactory(user_id=user.id, state=TodoState.trash))
+    await session.commit()
+    purger = TrashPurger(retention_days=30, batch_size=2, pause=0)
+
+    assert await purger.run(session.bind) == expected_purged
+    assert await purger.run(session.bind) == 0
+
+    states = (await session.scalars(select(Todo.state))).all()
+    assert sorted(states) == [TodoState.done, TodoState.trash]
+    assert purger.stats() == {
+        'runs': 2,
+        'errors': 0,
+        'purged_last_run': 0,
+        'purged_total': expected_purged,
+    }
+
+
+@pytest.mark.asyncio
+async def test_trash_purger_should_follow_the_database_clock(session, user):
+    # a session west of UTC stores updated_at hours behind the UTC clock
+    engine = create_async_engine(
+        session.bind.url, connect_args={'options': '-c TimeZone=Etc/GMT+12'}
+    )
+    async with AsyncSession(engine) as west:
+        west.add(TodoFactory(user_id=user.id, state=TodoState.trash))
+        await west.commit()
+    purger = TrashPurger(retention_days=0.25, batch_size=10, pause=0)
+
+    assert await purger.run(engine) == 0
+    await engine.dispose()
@@ -1,8 +1,22 @@
+import asyncio
+import threading
 from http import HTTPStatus
 
+import pytest
+from fastapi import HTTPException
+from freezegun import freeze_time
 from jwt import decode
 
-from guara.security import create_access_token, settings
+from guara import security
+from guara.security import (
+    PasswordHasher,
+    TokenCache,
+    create_access_token,
+    decode_token,
+    get_password_hash_async,
+    settings,
+    verify_password_async,
+)
 
 
 def test_jwt():
@@ -23,3 +37,95 @@ def test_jwt_invalid_token(client):
 
     assert response.status_code == HTTPStatus.UNAUTHORIZED
     assert response.json() == {'detail': 'Could not validate credentials'}
+
+
+@pytest.mark.asyncio
+async def test_password_hash_async_roundtrip():
+    hashed = await get_password_hash_async('secret')
+
+    assert await verify_password_async('secret', hashed)
+    assert not await verify_password_async('wrong', hashed)
+
+
+@pytest.mark.asyncio
+async def test_password_hasher_caps_concurrency():
+    expected_queued = 2
+    hasher = PasswordHasher(max_workers=1)
+    release = threading.Event()
+    tasks = [asyncio.create_task(hasher.run(release.wait)) for _ in range(3)]
+
+    try:
+        while hasher.stats()['running'] == 0:
+            await asyncio.sleep(0.01)
+
+        assert hasher.stats()['running'] == 1
+        assert hasher.stats()['queued'] == expected_queued
+    finally:
+        release.set()
+
+    await asyncio.gather(*tasks)
+
+    assert hasher.stats()['running'] == 0
+    assert hasher.stats()['queued'] == 0
+    assert hasher.stats()['max_queued'] >= expected_queued
+
+
+@pytest.mark.asyncio
+async def test_password_hasher_should_not_count_cancelled_waiters():
+    hasher = PasswordHasher(max_workers=1)
+    release = threading.Event()
+    running = asyncio.create_task(hasher.run(release.wait))
+    while hasher.stats()['running'] == 0:
+        await asyncio.sleep(0.01)
+
+    waiting = asyncio.create_task(hasher.run(release.wait))
+    await asyncio.sleep(0.01)
+    waiting.cancel()
+    with pytest.raises(asyncio.CancelledError):
+        await waiting
+    release.set()
+    await running
+
+    assert hasher.stats()['queued'] == 0
+    assert hasher.stats()['running'] == 0
+
+
+def test_decode_token_should_reuse_verified_claims(monkeypatch):
+    token = create_access_token({'sub': 'cached@test.com'})
+    calls = []
+    original = security.decode
+
+    def counting_decode(*args, **kwargs):
+        calls.append(args)
+        return original(*args, **kwargs)
+
+    monkeypatch.setattr(security, 'decode', counting_decode)
+
+    first = decode_token(token)
+
+    assert decode_token(token) == first
+    assert len(calls) == 1
+    assert security.token_cache.stats()['hits'] == 1
+
+
+def test_decode_token_should_not_serve_claims_past_exp():
+    with freeze_time('2023-07-14 12:00:00'):
+        token = create_access_token({'sub': 'cached@test.com'})
+        decode_token(token)
+
+    with (
+        freeze_time('2023-07-14 12:31:00'),
+        pytest.raises(HTTPException),
+    ):
+        decode_token(token)
+
+    assert security.token_cache.stats()['size'] == 0
+
+
+def test_token_cache_should_evict_least_recently_used():
+    cache = TokenCache(maxsize=1)
+    cache.set('a', {'sub': 'a', 'exp': float('inf')})
+    cache.set('b', {'sub': 'b', 'exp': float('inf')})
+
+    assert cache.get('a') is None
+    assert cache.get('b') == {'sub': 'b', 'exp': float('inf')}
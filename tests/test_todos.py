@@ -1,11 +1,21 @@
+import csv
+import io
+import json
 from http import HTTPStatus
 
 import factory.fuzzy
 import pytest
-from sqlalchemy import select
+from sqlalchemy import event, func, select, text, update
 from sqlalchemy.exc import StatementError
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
 
-from guara.models import Todo, TodoState, User
+from guara.counters import reconcile_counters, todo_counts
+from guara.importer import parse_todos, read_batch
+from guara.models import Todo, TodoCounter, TodoState, User, table_registry
+from guara.pagination import encode_cursor
+from guara.routers.todos import create_todos_bulk
+from guara.schemas import TodoBulkCreate, TodoImportResult, TodoPublic
+from tests.conftest import UserFactory, _count_queries
 
 
 class TodoFactory(factory.Factory):
@@ -40,6 +50,25 @@ def test_create_todo(client, token, mock_db_time):
     }
 
 
+def test_create_todo_single_statement(client, token, count_queries):
+    expected_queries = 2
+
+    with count_queries() as queries:
+        response = client.post(
+            '/todos/',
+            headers={'Authorization': f'Bearer {token}'},
+            json={
+                'title': 'Test todo',
+                'description': 'Test todo description',
+                'state': 'draft',
+            },
+        )
+
+    assert response.status_code == HTTPStatus.OK
+    assert response.json()['created_at']
+    assert len(queries) == expected_queries
+
+
 @pytest.mark.asyncio
 async def test_create_todo_error(session, user: User):
     todo = Todo(
@@ -91,6 +120,71 @@ async def test_list_todos_pagination_should_return_2_todos(
     assert len(response.json()['todos']) == expected_todos
 
 
+@pytest.mark.asyncio
+async def test_list_todos_cursor_pagination_should_walk_all_todos(
+    session, client, user, token
+):
+    expected_pages = [2, 2, 1]
+    session.add_all(TodoFactory.create_batch(5, user_id=user.id))
+    await session.commit()
+
+    pages, ids, cursor = [], [], None
+    while True:
+        params = {'limit': 2} | ({'cursor': cursor} if cursor else {})
+        response = client.get(
+            '/todos/',
+            params=params,
+            headers={'Authorization': f'Bearer {token}'},
+        )
+        todos = response.json()['todos']
+        pages.append(len(todos))
+        ids += [todo['id'] for todo in todos]
+        cursor = response.json()['next_cursor']
+        if not cursor:
+            break
+
+    assert pages == expected_pages
+    assert ids == sorted(set(ids))
+
+
+@pytest.mark.asyncio
+async def test_list_todos_cursor_respects_filters(
+    session, client, user, token
+):
+    expected_todos = 3
+    session.add_all(
+        TodoFactory.create_batch(3, user_id=user.id, state=TodoState.done)
+    )
+    session.add_all(
+        TodoFactory.create_batch(3, user_id=user.id, state=TodoState.draft)
+    )
+    await session.commit()
+
+    first = client.get(
+        '/todos/?state=done&limit=2',
+        headers={'Authorization': f'Bearer {token}'},
+    ).json()
+    second = client.get(
+        f'/todos/?state=done&limit=2&cursor={first["next_cursor"]}',
+        headers={'Authorization': f'Bearer {token}'},
+    ).json()
+
+    todos = first['todos'] + second['todos']
+    assert len(todos) == expected_todos
+    assert {todo['state'] for todo in todos} == {'done'}
+    assert second['next_cursor'] is None
+
+
+def test_list_todos_invalid_cursor(client, token):
+    response = client.get(
+        '/todos/?cursor=@@@',
+        headers={'Authorization': f'Bearer {token}'},
+    )
+
+    assert response.status_code == HTTPStatus.BAD_REQUEST
+    assert response.json() == {'detail': 'Invalid cursor'}
+
+
 @pytest.mark.asyncio
 async def test_list_todos_filter_title_should_return_5_todos(
     session, user, client, token
@@ -207,6 +301,342 @@ async def test_list_todos_should_return_all_expected_fields(
     ]
 
 
+@pytest.mark.asyncio
+async def test_patch_todo_should_not_load_user_todos(
+    session, client, user, token, count_queries
+):
+    expected_queries = 2
+    todos = TodoFactory.create_batch(50, user_id=user.id)
+    session.add_all(todos)
+    await session.commit()
+
+    with count_queries() as queries:
+        response = client.patch(
+            f'/todos/{todos[0].id}',
+            headers={'Authorization': f'Bearer {token}'},
+            json={'title': 'Updated Todo'},
+        )
+
+    assert response.status_code == HTTPStatus.OK
+    assert len(queries) == expected_queries
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize(
+    ('params', 'index'),
+    [
+        ({}, 'todos_pkey'),
+        ({'state': 'done'}, 'ix_todos_user_id_state_id'),
+        ({'title': 'needle'}, 'ix_todos_title_trgm'),
+        ({'description': 'needle'}, 'ix_todos_description_trgm'),
+        (
+            {'title': 'needle', 'cursor': encode_cursor(1)},
+            'ix_todos_title_trgm',
+        ),
+    ],
+)
+async def test_list_todos_query_should_use_index(  # noqa: PLR0913, PLR0917
+    session, client, token, user, engine, params, index
+):
+    # many rows to skip, a few to find: only then do the indexes pay off
+    await session.execute(
+        text(
+            'INSERT INTO todos (title, description, state, user_id) '
+            "SELECT 'filler ' || n, 'filler ' || n, 'todo', :user_id "
+            'FROM generate_series(1, 20000) AS n'
+        ),
+        {'user_id': user.id},
+    )
+    session.add_all(
+        TodoFactory.create_batch(
+            5, user_id=user.id, title='a needle', description='a needle'
+        )
+    )
+    await session.commit()
+    await session.execute(text('ANALYZE todos'))
+
+    # EXPLAIN exactly what the endpoint sends, as it sends it
+    sent = []
+
+    def capture(conn, cursor, statement, parameters, *args):
+        if 'FROM todos' in statement:
+            sent.append((statement, parameters))
+
+    event.listen(engine.sync_engine, 'before_cursor_execute', capture)
+    try:
+        client.get(
+            '/todos/',
+            headers={'Authorization': f'Bearer {token}'},
+            params=params,
+        )
+    finally:
+        event.remove(engine.sync_engine, 'before_cursor_execute', capture)
+
+    statement, parameters = sent[-1]
+    connection = await session.connection()
+    await connection.exec_driver_sql('SET LOCAL enable_seqscan = off')
+    result = await connection.exec_driver_sql(
+        f'EXPLAIN {statement}', parameters
+    )
+    plan = '\n'.join(result.scalars())
+
+    assert 'Seq Scan' not in plan
+    assert index in plan
+
+
+@pytest.mark.asyncio
+async def test_search_todos_should_rank_title_matches_first(
+    session, client, user, token
+):
+    in_description = TodoFactory(
+        user_id=user.id, title='Groceries', description='buy coffee beans'
+    )
+    in_title = TodoFactory(
+        user_id=user.id, title='Coffee beans', description='for the office'
+    )
+    session.add_all([
+        in_description,
+        in_title,
+        TodoFactory(user_id=user.id, title='Laundry', description='towels'),
+    ])
+    await session.commit()
+
+    response = client.get(
+        '/todos/search?q=coffee beans',
+        headers={'Authorization': f'Bearer {token}'},
+    )
+
+    assert response.status_code == HTTPStatus.OK
+    assert [todo['id'] for todo in response.json()['todos']] == [
+        in_title.id,
+        in_description.id,
+    ]
+
+
+@pytest.mark.asyncio
+async def test_search_todos_should_only_return_own_todos(
+    session, client, user, user_without_token, token
+):
+    session.add_all([
+        TodoFactory(user_id=user.id, title='Mine', description='release'),
+        TodoFactory(
+            user_id=user_without_token.id,
+            title='Theirs',
+            description='release',
+        ),
+    ])
+    await session.commit()
+
+    response = client.get(
+        '/todos/search?q=release',
+        headers={'Authorization': f'Bearer {token}'},
+    )
+
+    assert [todo['title'] for todo in response.json()['todos']] == ['Mine']
+
+
+@pytest.mark.asyncio
+async def test_search_todos_pagination(session, client, user, token):
+    expected_todos = 2
+    session.add_all(
+        TodoFactory.create_batch(
+            5, user_id=user.id, description='paginated "search" results'
+        )
+    )
+    await session.commit()
+
+    response = client.get(
+        '/todos/search?q="search"&offset=2&limit=2',
+        headers={'Authorization': f'Bearer {token}'},
+    )
+
+    assert len(response.json()['todos']) == expected_todos
+
+
+@pytest.mark.asyncio
+async def test_search_todos_should_follow_updates(
+    session, client, user, token
+):
+    todo = TodoFactory(user_id=user.id, title='Draft', description='notes')
+    session.add(todo)
+    await session.commit()
+
+    client.patch(
+        f'/todos/{todo.id}',
+        headers={'Authorization': f'Bearer {token}'},
+        json={'title': 'Quarterly report'},
+    )
+    response = client.get(
+        '/todos/search?q=quarterly',
+        headers={'Authorization': f'Bearer {token}'},
+    )
+
+    assert [t['id'] for t in response.json()['todos']] == [todo.id]
+
+
+@pytest.mark.parametrize('q', ['', '%20%20'])
+def test_search_todos_requires_query(client, token, q):
+    response = client.get(
+        f'/todos/search?q={q}',
+        headers={'Authorization': f'Bearer {token}'},
+    )
+
+    assert response.status_code == HTTPStatus.UNPROCESSABLE_ENTITY
+
+
+def test_create_todos_bulk(client, token, count_queries):
+    expected_queries = 2
+    payload = [
+        {'title': f'Todo {n}', 'description': 'bulk', 'state': 'todo'}
+        for n in range(50)
+    ]
+
+    with count_queries() as queries:
+        response = client.post(
+            '/todos/bulk',
+            headers={'Authorization': f'Bearer {token}'},
+            json={'todos': payload},
+        )
+
+    results = response.json()['results']
+    assert response.status_code == HTTPStatus.CREATED
+    assert [r['todo']['title'] for r in results] == [
+        todo['title'] for todo in payload
+    ]
+    assert {r['status_code'] for r in results} == {HTTPStatus.CREATED}
+    assert len(queries) == expected_queries
+
+
+@pytest.mark.asyncio
+async def test_create_todos_bulk_on_sqlite_should_send_one_insert(tmp_path):
+    expected_inserts = 1
+    engine = create_async_engine(f'sqlite+aiosqlite:///{tmp_path}/bulk.db')
+    async with engine.begin() as conn:
+        await conn.run_sync(table_registry.metadata.create_all)
+    payload = TodoBulkCreate(
+        todos=[
+            {'title': f'Todo {n}', 'description': 'bulk', 'state': 'todo'}
+            for n in range(50)
+        ]
+    )
+
+    async with AsyncSession(engine, expire_on_commit=False) as session:
+        user = UserFactory()
+        session.add(user)
+        await session.commit()
+        with _count_queries(engine=engine) as queries:
+            result = await create_todos_bulk(payload, user, session)
+    await engine.dispose()
+
+    assert [r['todo'].title for r in result['results']] == [
+        todo.title for todo in payload.todos
+    ]
+    inserts = [query for query in queries if query.startswith('INSERT')]
+    assert len(inserts) == expected_inserts
+
+
+def test_create_todos_bulk_should_validate_every_item(client, token):
+    response = client.post(
+        '/todos/bulk',
+        headers={'Authorization': f'Bearer {token}'},
+        json={
+            'todos': [
+                {'title': 'ok', 'description': 'ok', 'state': 'todo'},
+                {'title': 'bad', 'description': 'bad', 'state': 'nope'},
+            ]
+        },
+    )
+
+    assert response.status_code == HTTPStatus.UNPROCESSABLE_ENTITY
+
+
+@pytest.mark.asyncio
+async def test_update_todos_bulk(session, client, user, token, count_queries):
+    expected_queries = 2
+    other_user = UserFactory()
+    session.add(other_user)
+    await session.flush()
+    todos = TodoFactory.create_batch(
+        3, user_id=user.id, title='Old', state=TodoState.todo
+    )
+    foreign = TodoFactory(user_id=other_user.id)
+    session.add_all([*todos, foreign])
+    await session.commit()
+
+    with count_queries() as queries:
+        response = client.patch(
+            '/todos/bulk',
+            headers={'Authorization': f'Bearer {token}'},
+            json={
+                'todos': [
+                    {'id': todos[0].id, 'title': 'New'},
+                    {'id': todos[1].id, 'state': 'done'},
+                    {'id': foreign.id, 'title': 'Hijacked'},
+                    {'id': 999, 'title': 'Missing'},
+                ]
+            },
+        )
+
+    results = response.json()['results']
+    assert response.status_code == HTTPStatus.OK
+    assert [r['status_code'] for r in results] == [
+        HTTPStatus.OK,
+        HTTPStatus.OK,
+        HTTPStatus.NOT_FOUND,
+        HTTPStatus.NOT_FOUND,
+    ]
+    assert results[0]['todo']['title'] == 'New'
+    assert results[0]['todo']['state'] == 'todo'
+    assert results[1]['todo']['title'] == 'Old'
+    assert results[1]['todo']['state'] == 'done'
+    assert results[2]['detail'] == 'Task not found.'
+    assert len(queries) == expected_queries
+
+    await session.refresh(foreign)
+    assert foreign.title != 'Hijacked'
+
+
+def test_update_todos_bulk_should_reject_duplicate_ids(client, token):
+    response = client.patch(
+        '/todos/bulk',
+        headers={'Authorization': f'Bearer {token}'},
+        json={'todos': [{'id': 1, 'title': 'a'}, {'id': 1, 'title': 'b'}]},
+    )
+
+    assert response.status_code == HTTPStatus.UNPROCESSABLE_ENTITY
+
+
+@pytest.mark.asyncio
+async def test_delete_todos_bulk(session, client, user, token, count_queries):
+    expected_queries = 2
+    other_user = UserFactory()
+    session.add(other_user)
+    await session.flush()
+    todos = TodoFactory.create_batch(2, user_id=user.id)
+    foreign = TodoFactory(user_id=other_user.id)
+    session.add_all([*todos, foreign])
+    await session.commit()
+
+    with count_queries() as queries:
+        response = client.request(
+            'DELETE',
+            '/todos/bulk',
+            headers={'Authorization': f'Bearer {token}'},
+            json={'ids': [todos[0].id, todos[1].id, foreign.id]},
+        )
+
+    assert response.status_code == HTTPStatus.OK
+    assert [r['status_code'] for r in response.json()['results']] == [
+        HTTPStatus.OK,
+        HTTPStatus.OK,
+        HTTPStatus.NOT_FOUND,
+    ]
+    assert len(queries) == expected_queries
+
+    remaining = await session.scalars(select(Todo.id))
+    assert remaining.all() == [foreign.id]
+
+
 def test_patch_todo_error(client, token):
     response = client.patch(
         '/todos/10',
@@ -252,6 +682,45 @@ async def test_delete_todo(session, client, user, token):
     }
 
 
+@pytest.mark.asyncio
+async def test_delete_todo_single_statement(
+    session, client, user, token, count_queries
+):
+    expected_queries = 2
+    todo = TodoFactory(user_id=user.id)
+    session.add(todo)
+    await session.commit()
+
+    with count_queries() as queries:
+        response = client.delete(
+            f'/todos/{todo.id}',
+            headers={'Authorization': f'Bearer {token}'},
+        )
+
+    assert response.status_code == HTTPStatus.OK
+    assert len(queries) == expected_queries
+
+
+@pytest.mark.asyncio
+async def test_delete_todo_of_other_user_should_return_not_found(
+    session, client, token
+):
+    other_user = UserFactory()
+    session.add(other_user)
+    await session.flush()
+    todo = TodoFactory(user_id=other_user.id)
+    session.add(todo)
+    await session.commit()
+
+    response = client.delete(
+        f'/todos/{todo.id}',
+        headers={'Authorization': f'Bearer {token}'},
+    )
+
+    assert response.status_code == HTTPStatus.NOT_FOUND
+    assert await session.scalar(select(Todo.id)) == todo.id
+
+
 def test_delete_todo_error(client, token):
     response = client.delete(
         '/todos/10',
@@ -259,3 +728,236 @@ def test_delete_todo_error(client, token):
     )
     assert response.status_code == HTTPStatus.NOT_FOUND
     assert response.json() == {'detail': 'Task not found.'}
+
+
+@pytest.mark.asyncio
+async def test_list_todos_if_none_match_should_skip_unchanged_page(
+    session, client, user, token, count_queries
+):
+    # the first GET cached the user, so the poll is one narrow SELECT
+    expected_queries = 1
+    todo = TodoFactory(user_id=user.id)
+    session.add(todo)
+    await session.commit()
+    headers = {'Authorization': f'Bearer {token}'}
+    etag = client.get('/todos/', headers=headers).headers['ETag']
+
+    with count_queries() as queries:
+        response = client.get(
+            '/todos/', headers=headers | {'If-None-Match': etag}
+        )
+
+    assert response.status_code == HTTPStatus.NOT_MODIFIED
+    assert response.headers['ETag'] == etag
+    assert not response.content
+    assert len(queries) == expected_queries
+
+    client.patch(f'/todos/{todo.id}', headers=headers, json={'title': 'New'})
+    response = client.get('/todos/', headers=headers | {'If-None-Match': etag})
+
+    assert response.status_code == HTTPStatus.OK
+    assert response.headers['ETag'] != etag
+    assert response.json()['todos'][0]['title'] == 'New'
+
+
+@pytest.mark.asyncio
+async def test_export_todos_ndjson_should_stream_only_own_todos(
+    session, client, user, token
+):
+    other_user = UserFactory()
+    session.add(other_user)
+    await session.flush()
+    todos = TodoFactory.create_batch(3, user_id=user.id)
+    session.add_all([*todos, TodoFactory(user_id=other_user.id)])
+    await session.commit()
+
+    response = client.get(
+        '/todos/export',
+        headers={'Authorization': f'Bearer {token}'},
+    )
+
+    assert response.status_code == HTTPStatus.OK
+    assert response.headers['content-type'] == 'application/x-ndjson'
+    lines = [json.loads(line) for line in response.text.splitlines()]
+    assert [line['id'] for line in lines] == [todo.id for todo in todos]
+    assert set(lines[0]) == set(TodoPublic.model_fields)
+
+
+@pytest.mark.asyncio
+async def test_export_todos_csv_should_apply_filters(
+    session, client, user, token
+):
+    expected_rows = 2
+    session.add_all(
+        TodoFactory.create_batch(2, user_id=user.id, state=TodoState.done)
+    )
+    session.add(TodoFactory(user_id=user.id, state=TodoState.draft))
+    await session.commit()
+
+    response = client.get(
+        '/todos/export?format=csv&state=done',
+        headers={'Authorization': f'Bearer {token}'},
+    )
+
+    assert response.status_code == HTTPStatus.OK
+    assert response.headers['content-type'].startswith('text/csv')
+    rows = list(csv.DictReader(io.StringIO(response.text)))
+    assert len(rows) == expected_rows
+    assert {row['state'] for row in rows} == {'done'}
+
+
+def test_list_todos_limit_above_maximum_should_be_rejected(client, token):
+    response = client.get(
+        '/todos/?limit=1001',
+        headers={'Authorization': f'Bearer {token}'},
+    )
+
+    assert response.status_code == HTTPStatus.UNPROCESSABLE_ENTITY
+
+
+@pytest.mark.asyncio
+async def test_import_todos_ndjson_should_report_rejected_lines(
+    session, client, user, token, monkeypatch
+):
+    expected_accepted = 3
+    monkeypatch.setattr('guara.importer.BATCH_SIZE', 2)
+    good = {'title': 'Imported', 'description': 'Desc', 'state': 'todo'}
+    lines = [
+        json.dumps(good),
+        json.dumps(good | {'state': 'unknown'}),
+        json.dumps(good),
+        '{not json',
+        '',
+        json.dumps(good),
+    ]
+
+    response = client.post(
+        '/todos/import',
+        headers={'Authorization': f'Bearer {token}'},
+        files={'file': ('todos.ndjson', '\n'.join(lines))},
+    )
+
+    assert response.status_code == HTTPStatus.OK
+    result = response.json()
+    assert result['accepted'] == expected_accepted
+    assert [error['line'] for error in result['errors']] == [2, 4]
+    todos = await session.scalars(select(Todo).where(Todo.user_id == user.id))
+    assert len(todos.all()) == expected_accepted
+
+
+def test_read_batch_should_report_errors_as_models():
+    upload = io.BytesIO(b'{"title": "x"}\n{not json\n')
+
+    result = TodoImportResult()
+    read_batch(parse_todos(upload, 'ndjson'), result)
+
+    # warnings='error' turns a dict slipped into the list into a failure
+    assert result.model_dump(warnings='error')['errors'] == [
+        {
+            'line': 1,
+            'detail': 'description: Field required; state: Field required',
+        },
+        {'line': 2, 'detail': result.errors[1].detail},
+    ]
+
+
+@pytest.mark.asyncio
+async def test_import_todos_csv_should_accept_an_export(
+    session, client, user, token
+):
+    expected_accepted = 2
+    session.add_all(TodoFactory.create_batch(2, user_id=user.id))
+    await session.commit()
+    headers = {'Authorization': f'Bearer {token}'}
+    export = client.get('/todos/export?format=csv', headers=headers)
+
+    response = client.post(
+        '/todos/import?format=csv',
+        headers=headers,
+        files={'file': ('todos.csv', export.content)},
+    )
+
+    assert response.json() == {
+        'accepted': expected_accepted,
+        'rejected': 0,
+        'errors': [],
+    }
+
+
+@pytest.mark.asyncio
+async def test_import_todos_undecodable_file_should_insert_nothing(
+    session, client, token
+):
+    response = client.post(
+        '/todos/import',
+        headers={'Authorization': f'Bearer {token}'},
+        files={'file': ('todos.ndjson', b'\xff\xfe\x00')},
+    )
+
+    assert response.status_code == HTTPStatus.BAD_REQUEST
+    assert response.json() == {'detail': 'File could not be parsed'}
+    assert await session.scalar(select(Todo.id)) is None
+
+
+async def _counts_by_state(session, user_id):
+    rows = await session.execute(
+        select(Todo.state, func.count())
+        .where(Todo.user_id == user_id)
+        .group_by(Todo.state)
+    )
+    return {state.value: count for state, count in rows}
+
+
+@pytest.mark.asyncio
+async def test_todo_stats_should_follow_every_write(
+    session, client, user, token
+):
+    headers = {'Authorization': f'Bearer {token}'}
+    todo = {'title': 'Stats', 'description': 'Desc', 'state': 'todo'}
+    first = client.post('/todos/', headers=headers, json=todo).json()
+    bulk = client.post(
+        '/todos/bulk', headers=headers, json={'todos': [todo] * 4}
+    ).json()['results']
+    client.post(
+        '/todos/import',
+        headers=headers,
+        files={'file': ('todos.ndjson', json.dumps(todo | {'state': 'done'}))},
+    )
+    client.patch(
+        f'/todos/{first["id"]}', headers=headers, json={'state': 'doing'}
+    )
+    client.patch(
+        '/todos/bulk',
+        headers=headers,
+        json={'todos': [{'id': bulk[0]['id'], 'state': 'trash'}]},
+    )
+    client.delete(f'/todos/{bulk[1]["id"]}', headers=headers)
+    client.request(
+        'DELETE', '/todos/bulk', headers=headers, json={'ids': [bulk[2]['id']]}
+    )
+
+    response = client.get('/todos/stats', headers=headers)
+
+    expected = await _counts_by_state(session, user.id)
+    assert response.status_code == HTTPStatus.OK
+    assert response.json() == {
+        'counts': dict.fromkeys(TodoState, 0) | expected,
+        'total': sum(expected.values()),
+    }
+
+
+@pytest.mark.asyncio
+async def test_reconcile_counters_should_rebuild_drifted_counts(session, user):
+    session.add_all(TodoFactory.create_batch(3, user_id=user.id))
+    await session.commit()
+    await session.execute(update(TodoCounter).values(count=99))
+    session.add(TodoCounter(user_id=user.id + 1, state='trash', count=5))
+    await session.flush()
+
+    await reconcile_counters(await session.connection())
+    await session.commit()
+
+    counts = await todo_counts(session, user.id)
+    expected = await _counts_by_state(session, user.id)
+    assert {state.value: n for state, n in counts.items() if n} == expected
+    assert not any((await todo_counts(session, user.id + 1)).values())
@@ -1,5 +1,13 @@
 from http import HTTPStatus
 
+import pytest
+from sqlalchemy import func, select
+
+from guara.deletion import deletion_jobs
+from guara.models import Todo
+from tests.conftest import UserFactory
+from tests.test_todos import TodoFactory
+
 
 def test_create_user(client):
     response = client.post(
@@ -18,6 +26,21 @@ def test_create_user(client):
     }
 
 
+def test_create_user_single_statement(client, count_queries):
+    with count_queries() as queries:
+        response = client.post(
+            '/users/',
+            json={
+                'username': 'alice',
+                'email': 'alice@example.com',
+                'password': 'secret',
+            },
+        )
+
+    assert response.status_code == HTTPStatus.CREATED
+    assert len(queries) == 1
+
+
 def test_create_user_should_return_409_email_unique_constraint(client, user):
     response = client.post(
         '/users/',
@@ -49,7 +72,34 @@ def test_create_user_should_return_409_username_unique_constraint(
 def test_read_users(client):
     response = client.get('/users')
     assert response.status_code == HTTPStatus.OK
-    assert response.json() == {'users': []}
+    assert response.json() == {'users': [], 'next_cursor': None}
+
+
+@pytest.mark.asyncio
+async def test_read_users_cursor_pagination(session, client):
+    expected_users = 5
+    session.add_all(UserFactory.create_batch(expected_users))
+    await session.commit()
+
+    ids, cursor = [], None
+    while True:
+        params = {'limit': 2} | ({'cursor': cursor} if cursor else {})
+        response = client.get('/users/', params=params)
+        assert response.status_code == HTTPStatus.OK
+        ids += [user['id'] for user in response.json()['users']]
+        cursor = response.json()['next_cursor']
+        if not cursor:
+            break
+
+    assert ids == sorted(ids)
+    assert len(ids) == expected_users
+
+
+def test_read_users_invalid_cursor(client):
+    response = client.get('/users/', params={'cursor': 'not a cursor'})
+
+    assert response.status_code == HTTPStatus.BAD_REQUEST
+    assert response.json() == {'detail': 'Invalid cursor'}
 
 
 def test_get_user(client, user):
@@ -62,6 +112,33 @@ def test_get_user(client, user):
     }
 
 
+def test_get_user_if_none_match_should_return_not_modified(
+    client, user, token
+):
+    etag = client.get(f'/users/{user.id}').headers['ETag']
+
+    response = client.get(f'/users/{user.id}', headers={'If-None-Match': etag})
+
+    assert response.status_code == HTTPStatus.NOT_MODIFIED
+    assert response.headers['ETag'] == etag
+    assert not response.content
+
+    client.put(
+        f'/users/{user.id}',
+        headers={'Authorization': f'Bearer {token}'},
+        json={
+            'username': 'renamed',
+            'email': user.email,
+            'password': 'secret',
+        },
+    )
+    response = client.get(f'/users/{user.id}', headers={'If-None-Match': etag})
+
+    assert response.status_code == HTTPStatus.OK
+    assert response.headers['ETag'] != etag
+    assert response.json()['username'] == 'renamed'
+
+
 def test_get_user_should_return_not_found(client):
     response = client.get('/users/999')
     assert response.status_code == HTTPStatus.NOT_FOUND
@@ -86,6 +163,24 @@ def test_update_user(client, user, token):
     }
 
 
+def test_update_user_single_statement(client, user, token, count_queries):
+    expected_queries = 2
+
+    with count_queries() as queries:
+        response = client.put(
+            f'/users/{user.id}',
+            headers={'Authorization': f'Bearer {token}'},
+            json={
+                'username': 'alice',
+                'email': 'alice@example.com',
+                'password': 'new_secret',
+            },
+        )
+
+    assert response.status_code == HTTPStatus.OK
+    assert len(queries) == expected_queries
+
+
 def test_update_integrity_error(client, user, user_without_token, token):
     other_user = user_without_token
     # changing fixture user to have the same username and email
@@ -128,6 +223,110 @@ def test_delete_user(client, user, token):
     }
 
 
+@pytest.mark.asyncio
+async def test_delete_user_should_remove_todos_without_loading_them(
+    session, client, user, token, count_queries
+):
+    expected_queries = 4  # current user, counters, todo batch, user row
+    session.add_all(TodoFactory.create_batch(3, user_id=user.id))
+    await session.commit()
+
+    with count_queries() as queries:
+        response = client.delete(
+            f'/users/{user.id}', headers={'Authorization': f'Bearer {token}'}
+        )
+
+    assert response.status_code == HTTPStatus.OK
+    assert len(queries) == expected_queries
+    assert not any(query.startswith('SELECT todos') for query in queries)
+    assert await session.scalar(select(func.count(Todo.id))) == 0
+
+
+@pytest.mark.asyncio
+async def test_delete_heavy_user_should_run_as_batched_job(
+    session, client, user, token, monkeypatch
+):
+    expected_todos = 5
+    monkeypatch.setattr(deletion_jobs, 'batch_size', 2)
+    session.add_all(TodoFactory.create_batch(expected_todos, user_id=user.id))
+    await session.commit()
+
+    response = client.delete(
+        f'/users/{user.id}', headers={'Authorization': f'Bearer {token}'}
+    )
+
+    job_id = response.json()['job_id']
+    location = f'/users/{user.id}/deletion/{job_id}'
+    assert response.status_code == HTTPStatus.ACCEPTED
+    assert response.headers['Location'] == location
+    assert response.json()['status'] == 'running'
+
+    response = client.get(location)
+
+    assert response.json() == {
+        'job_id': job_id,
+        'user_id': user.id,
+        'status': 'done',
+        'total': expected_todos,
+        'deleted': expected_todos,
+    }
+    assert client.get(f'/users/{user.id}').status_code == HTTPStatus.NOT_FOUND
+    assert await session.scalar(select(func.count(Todo.id))) == 0
+
+    response = client.get(f'/users/{user.id}/deletion/guessed')
+
+    assert response.status_code == HTTPStatus.NOT_FOUND
+
+
+@pytest.mark.asyncio
+async def test_delete_user_should_take_over_a_dead_job(
+    session, client, user, token, monkeypatch
+):
+    expected_todos = 5
+    monkeypatch.setattr(deletion_jobs, 'batch_size', 2)
+    session.add_all(TodoFactory.create_batch(expected_todos, user_id=user.id))
+    await session.commit()
+    # a worker started the job and died: its lease is already gone
+    monkeypatch.setattr(deletion_jobs, 'lease', 0)
+    dead = await deletion_jobs.start(user.id, expected_todos)
+
+    response = client.delete(
+        f'/users/{user.id}', headers={'Authorization': f'Bearer {token}'}
+    )
+
+    assert response.status_code == HTTPStatus.ACCEPTED
+    assert response.json()['job_id'] != dead['job_id']
+    progress = await deletion_jobs.progress(user.id)
+    assert progress['status'] == 'done'
+    assert progress['deleted'] == expected_todos
+
+
+@pytest.mark.asyncio
+async def test_delete_user_should_not_restart_a_live_job(
+    session, client, user, token, monkeypatch
+):
+    expected_todos = 5
+    monkeypatch.setattr(deletion_jobs, 'batch_size', 2)
+    session.add_all(TodoFactory.create_batch(expected_todos, user_id=user.id))
+    await session.commit()
+    live = await deletion_jobs.start(user.id, expected_todos)
+
+    response = client.delete(
+        f'/users/{user.id}', headers={'Authorization': f'Bearer {token}'}
+    )
+
+    assert response.status_code == HTTPStatus.ACCEPTED
+    assert response.json() == live
+    assert await session.scalar(select(func.count(Todo.id))) == expected_todos
+
+
+def test_read_user_deletion_not_found(client):
+    response = client.get('/users/999/deletion/anything')
+
+    assert response.status_code == HTTPStatus.NOT_FOUND
+    assert response.json() == {'detail': 'No deletion found'}
+
+
 def test_delete_user_wrong_token(client, user_without_token, token):
     response = client.delete(
         f'/users/{user_without_token.id}',